@@ -1,10 +1,78 @@
 from pydantic_settings import BaseSettings
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     ALGORITHM: str
     SECRET_KEY: str
     GOOGLE_CLIENT_ID: str
 
+    # Storage profile. Only SQLite URLs are accepted, the SQLite settings are
+    # applied to every connection; the defaults suit a single API worker
+    # with many concurrent scanners.
+    DATABASE_URL: str = "sqlite:///./event_invite.db"
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    # Queue writers on an in-process lock instead of SQLite's busy handler
+    SQLITE_WRITE_LANE: bool = True
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+
+    # Threads running the sync routes, defaults to anyio's 40. Every database
+    # call happens in this pool.
+    THREADPOOL_SIZE: Optional[int] = None
+
+    # Guest list uploads
+    GUEST_LIST_MAX_BYTES: int = 10 * 1024 * 1024
+    GUEST_LIST_MAX_ROWS: int = 50_000
+    GUEST_LIST_BATCH_SIZE: int = 500
+
+    # QR codes are rendered on first view. Set QR_DISK_CACHE_DIR to "" to keep
+    # them in memory only.
+    QR_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    QR_DISK_CACHE_DIR: str = "static/qr_codes"
+    # Worker processes for QR pre-rendering, defaults to the CPU count
+    QR_PRERENDER_WORKERS: Optional[int] = None
+
+    # Most scans accepted by one offline sync request
+    SCAN_SYNC_MAX_BATCH: int = 1000
+
+    # Live attendance streams
+    LIVE_MAX_CONNECTIONS_PER_EVENT: int = 20
+    LIVE_HEARTBEAT_SECONDS: int = 15
+    LIVE_QUEUE_SIZE: int = 256
+
+    # Events whose guest typeahead index is kept in memory
+    TYPEAHEAD_MAX_EVENTS: int = 64
+
+    # Background jobs for file writes, deletes and renders
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_SIZE: int = 1000
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_DELAY_SECONDS: float = 1.0
+    # Finished jobs kept for GET /jobs
+    JOB_HISTORY_SIZE: int = 200
+
+    # Users resolved from auth tokens, kept per subject
+    AUTH_CACHE_MAX_USERS: int = 1024
+    AUTH_CACHE_TTL_SECONDS: int = 60
+
+    # Cache-Control per route. QR images never change for a token. Event
+    # images are addressed by event id, so they are revalidated; the
+    # original served while variants render is not cached at all.
+    HTTP_CACHE_POLICIES: Dict[str, str] = {
+        "qrcode": "public, max-age=31536000, immutable",
+        "event_image": "public, max-age=3600, stale-while-revalidate=86400",
+        "event_image_pending": "no-cache",
+    }
+
+    # List endpoint page sizes
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 200
+
     class Config:
         env_file = ".env"
 
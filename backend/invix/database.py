@@ -1,18 +1,161 @@
-from sqlalchemy import create_engine
+from threading import Lock
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.sql.elements import TextClause
+import os
 
-DATABASE_URL = "sqlite:///./event_invite.db"
-# DATABASE_URL = "sqlite:///invix/event_invite.db"
+# Local imports
+from variables import (
+    DATABASE_URL,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_MMAP_SIZE,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_WRITE_LANE,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# from .variables import (
+#     DATABASE_URL,
+#     SQLITE_JOURNAL_MODE,
+#     SQLITE_SYNCHRONOUS,
+#     SQLITE_MMAP_SIZE,
+#     SQLITE_CACHE_SIZE_KB,
+#     SQLITE_BUSY_TIMEOUT_MS,
+#     SQLITE_WRITE_LANE,
+#     DB_POOL_SIZE,
+#     DB_MAX_OVERFLOW,
+#     DB_POOL_TIMEOUT,
+# )
+
+
+# Builds the engine for the storage profile. Every pooled connection gets
+# the profile's PRAGMAs when it is opened. Only SQLite is supported: the
+# counters use INSERT OR REPLACE and guest search uses FTS5.
+def create_db_engine(
+    url: str = DATABASE_URL,
+    journal_mode: str = SQLITE_JOURNAL_MODE,
+    synchronous: str = SQLITE_SYNCHRONOUS,
+    mmap_size: int = SQLITE_MMAP_SIZE,
+    cache_size_kb: int = SQLITE_CACHE_SIZE_KB,
+    busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS,
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+):
+    if not url.startswith("sqlite"):
+        # Only the scheme, the URL can hold a password
+        scheme = url.split(":", 1)[0]
+        raise ValueError(f"DATABASE_URL must be an SQLite URL, got {scheme}")
+
+    engine = create_engine(
+        url,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": busy_timeout_ms / 1000,
+        },
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    pragmas = {
+        "journal_mode": journal_mode,
+        "synchronous": synchronous,
+        "mmap_size": mmap_size,
+        # Negative sizes are in KiB rather than pages
+        "cache_size": -cache_size_kb,
+        "busy_timeout": busy_timeout_ms,
+    }
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+
+def _is_write(orm_execute_state) -> bool:
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        return True
+    statement = orm_execute_state.statement
+    if isinstance(statement, TextClause):
+        return not statement.text.lstrip().upper().startswith(("SELECT", "WITH"))
+    return False
+
+
+# Lets one session at a time hold a write transaction in this process.
+# Writers queue on the lock instead of spinning on SQLite's busy handler,
+# and readers never take it, so with WAL they never wait on a writer. A
+# session joins the lane at its first write and leaves when its transaction
+# commits, rolls back or the session closes.
+class WriteLane:
+    def __init__(self, timeout_seconds: float):
+        self.timeout_seconds = timeout_seconds
+        self._lock = Lock()
+
+    def attach(self, session_factory):
+        event.listen(session_factory, "before_flush", self._before_flush)
+        event.listen(session_factory, "do_orm_execute", self._on_execute)
+        event.listen(
+            session_factory, "after_transaction_end", self._on_transaction_end
+        )
+
+    def _enter(self, session):
+        if session.info.get("write_lane"):
+            return
+        if not self._lock.acquire(timeout=self.timeout_seconds):
+            raise TimeoutError("Timed out waiting for the database write lane")
+        session.info["write_lane"] = True
+
+    def _before_flush(self, session, flush_context, instances):
+        if session.new or session.dirty or session.deleted:
+            self._enter(session)
+
+    def _on_execute(self, orm_execute_state):
+        if _is_write(orm_execute_state):
+            self._enter(orm_execute_state.session)
+
+    def _on_transaction_end(self, session, transaction):
+        # Savepoints end inside the outer transaction
+        if transaction.parent is None and session.info.pop("write_lane", False):
+            self._lock.release()
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+write_lane = None
+if SQLITE_WRITE_LANE:
+    write_lane = WriteLane(SQLITE_BUSY_TIMEOUT_MS / 1000)
+    write_lane.attach(SessionLocal)
+
+
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), "alembic.ini")
+
 
+# Brings the schema up to date. Every table, index and trigger comes from a
+# migration, so Alembic can audit and downgrade all of it.
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    config = Config(ALEMBIC_INI)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
 
 
+# The one session provider for routes and auth dependencies. FastAPI caches
+# it per request, so a request shares a single session and transaction. The
+# session only checks out a connection once it runs its first query.
 def get_db():
     db = SessionLocal()
     try:
@@ -1,11 +1,12 @@
-from fastapi import Depends, FastAPI, Request
+from fastapi import Depends, FastAPI, HTTPException, Request, Query
 from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Optional
+from anyio import to_thread
 import logging
 from fastapi.staticfiles import StaticFiles
 import os
@@ -14,13 +15,23 @@ from dotenv import load_dotenv
 # Local imports
 from routes import auth, event
 from models import User as UserModel
-from schemas import PublicUser
-from database import get_db, init_db
+from schemas import PublicUser, Page
+from database import get_db, init_db, SessionLocal
+from operations.counters import rebuild_counters
+from operations.pagination import paginate
+from operations.jobs import jobs
+from operations.functions import fetch_admin_user
+from variables import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, THREADPOOL_SIZE
 
 # from .routes import auth, event
 # from .models import User as UserModel
-# from .schemas import PublicUser
-# from .database import get_db, init_db
+# from .schemas import PublicUser, Page
+# from .database import get_db, init_db, SessionLocal
+# from .operations.counters import rebuild_counters
+# from .operations.pagination import paginate
+# from .operations.jobs import jobs
+# from .operations.functions import fetch_admin_user
+# from .variables import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, THREADPOOL_SIZE
 
 # Load environment variables
 load_dotenv()
@@ -28,8 +39,14 @@ load_dotenv()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if THREADPOOL_SIZE:
+        to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
     init_db()
+    with SessionLocal() as db:
+        rebuild_counters(db, missing_only=True)
+    jobs.start()
     yield
+    jobs.stop()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -78,7 +95,25 @@ def get_status():
     return {"message": "Your URL is working! API is up and running 🚀"}
 
 
-@app.get("/users", response_model=List[PublicUser])
-def get_users(db: Session = Depends(get_db)):
-    users = db.query(UserModel).all()
-    return [PublicUser.model_validate(user) for user in users]
+@app.get("/users", response_model=Page[PublicUser])
+def get_users(
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    db: Session = Depends(get_db),
+):
+    return paginate(db.query(UserModel), UserModel.id, cursor, limit)
+
+
+# Background job queue: worker count, backlog, totals and the recent jobs.
+# Admins only, job errors can carry file paths and guest tokens.
+@app.get("/jobs")
+def get_jobs(current_user: PublicUser = Depends(fetch_admin_user)):
+    return jobs.stats()
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, current_user: PublicUser = Depends(fetch_admin_user)):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
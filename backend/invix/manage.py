@@ -0,0 +1,199 @@
+# Maintenance commands, run from this directory: python manage.py <command>
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import sessionmaker
+import argparse
+import os
+import tempfile
+import time
+import uuid
+
+# Local imports
+from database import Base, SessionLocal, WriteLane, create_db_engine, engine, init_db
+from models import Event, Guest, Attendance, EventCounter, ActivityLog
+from operations.checkin import SUCCESS, checkin_index, record_scan, rollback_scan
+from operations.counters import rebuild_counters
+
+# from .database import Base, SessionLocal, WriteLane, create_db_engine, engine, init_db
+# from .models import Event, Guest, Attendance, EventCounter, ActivityLog
+# from .operations.checkin import SUCCESS, checkin_index, record_scan, rollback_scan
+# from .operations.counters import rebuild_counters
+
+# The query shapes routes/event.py and operations/ run, each with the index
+# the planner should pick for it
+INDEX_CHECKS = [
+    (
+        "guest page",
+        select(Guest).where(Guest.event_id == 1, Guest.id > 0).order_by(Guest.id),
+        "ix_guests_event_id_id",
+    ),
+    (
+        "re-import match",
+        select(Guest.id).where(Guest.event_id == 1, Guest.match_key.in_(["a", "b"])),
+        "ix_guests_event_match_key",
+    ),
+    (
+        "user's event page",
+        select(Event).where(Event.created_by == 1, Event.id > 0).order_by(Event.id),
+        "ix_events_created_by_id",
+    ),
+    (
+        "activity log page",
+        select(ActivityLog)
+        .where(ActivityLog.event_id == 1, ActivityLog.id < 100)
+        .order_by(ActivityLog.id.desc()),
+        "ix_activitylogs_event_id_id",
+    ),
+    (
+        "check-in buckets",
+        select(func.count(ActivityLog.id)).where(
+            ActivityLog.event_id == 1,
+            ActivityLog.type == "check_in",
+            ActivityLog.created_at >= date(2026, 1, 1),
+            ActivityLog.created_at < date(2026, 1, 2),
+        ),
+        "ix_activitylogs_event_type_created_at",
+    ),
+    (
+        "attendance backfill",
+        select(func.max(ActivityLog.created_at)).where(
+            ActivityLog.guest_id == 1, ActivityLog.type == "check_in"
+        ),
+        "ix_activitylogs_guest_type_created_at",
+    ),
+]
+
+
+def check_indexes_command(args):
+    failed = 0
+    with engine.connect() as connection:
+        for label, statement, index in INDEX_CHECKS:
+            sql = statement.compile(
+                dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+            )
+            plan = " | ".join(
+                row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+            )
+            ok = index in plan
+            failed += not ok
+            print(f"{'ok' if ok else 'MISSING':>7}  {label}: {plan}")
+    if failed:
+        raise SystemExit(f"{failed} query plan(s) don't use their index")
+
+
+# SQLite's own defaults, the profile the app ran with before it was tunable
+BASELINE_PROFILE = {
+    "journal_mode": "DELETE",
+    "synchronous": "FULL",
+    "mmap_size": 0,
+    "cache_size_kb": 2000,
+}
+
+
+def rebuild_counters_command(args):
+    with SessionLocal() as db:
+        rebuilt = rebuild_counters(db, event_id=args.event_id)
+    print(f"Rebuilt counters for {rebuilt} event(s)")
+
+
+# Checks every guest of a scratch event in from concurrent threads and
+# returns scans per second, successful scans and failed commits
+def run_scan_benchmark(profile: dict, write_lane: bool, guests: int, threads: int):
+    directory = tempfile.mkdtemp()
+    url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    engine = create_db_engine(url, **profile)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    if write_lane:
+        WriteLane(30).attach(Session)
+    Base.metadata.create_all(bind=engine)
+
+    tokens = [str(uuid.uuid4()) for _ in range(guests)]
+    with Session() as db:
+        event = Event(name="Benchmark", date=date.today(), expected_guests=guests)
+        db.add(event)
+        db.flush()
+        event_id = event.id
+        db.add(EventCounter(event_id=event_id, total_guests=guests))
+        rows = [
+            {"name": f"Guest {i}", "event_id": event_id, "qr_token": token}
+            for i, token in enumerate(tokens)
+        ]
+        ids = db.execute(insert(Guest).returning(Guest.id), rows).scalars().all()
+        db.execute(
+            insert(Attendance),
+            [{"guest_id": guest_id, "event_id": event_id} for guest_id in ids],
+        )
+        db.commit()
+        checkin_index.drop_event(event_id)
+        checkin_index.warm(db, event_id)
+
+    def scan(token):
+        with Session() as db:
+            outcome, entry, previous = record_scan(db, token, "check_in", None)
+            if outcome != SUCCESS:
+                return outcome
+            try:
+                db.commit()
+                return outcome
+            except Exception as e:
+                rollback_scan(db, entry, previous)
+                return type(e).__name__
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = list(pool.map(scan, tokens))
+    elapsed = time.perf_counter() - started
+
+    checkin_index.drop_event(event_id)
+    engine.dispose()
+    succeeded = outcomes.count(SUCCESS)
+    return guests / elapsed, succeeded, guests - succeeded
+
+
+def bench_scans_command(args):
+    runs = [
+        ("baseline", BASELINE_PROFILE, False),
+        ("configured", {}, True),
+    ]
+    for label, profile, write_lane in runs:
+        rate, succeeded, failed = run_scan_benchmark(
+            profile, write_lane, args.guests, args.threads
+        )
+        print(
+            f"{label:>10}: {rate:8.1f} scans/s, {succeeded} checked in, {failed} failed"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Invix maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser(
+        "rebuild-counters",
+        help="Recompute event counters from the guests and attendance tables",
+    )
+    rebuild.add_argument("--event-id", type=int, help="Only rebuild this event")
+    rebuild.set_defaults(handler=rebuild_counters_command)
+
+    check = commands.add_parser(
+        "check-indexes",
+        help="EXPLAIN QUERY PLAN the hot queries and check they use their indexes",
+    )
+    check.set_defaults(handler=check_indexes_command)
+
+    bench = commands.add_parser(
+        "bench-scans",
+        help="Compare check-in throughput of SQLite's defaults and the configured profile",
+    )
+    bench.add_argument("--guests", type=int, default=2000)
+    bench.add_argument("--threads", type=int, default=8)
+    bench.set_defaults(handler=bench_scans_command)
+
+    args = parser.parse_args()
+    init_db()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+from logging.config import fileConfig
+from alembic import context
+
+# Local imports
+from database import Base, engine
+import models  # noqa: F401, registers the tables on Base.metadata
+
+# from ..database import Base, engine
+# from .. import models
+
+config = context.config
+
+# The app runs migrations at startup with its own logging already set up
+if config.config_file_name is not None and config.attributes.get(
+    "configure_logger", True
+):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=True,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,104 @@
+"""baseline
+
+The users, events, guests and activitylogs tables as they were before
+migrations existed. Databases created back then already have them and are
+left as they are.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("phone", sa.String(), nullable=True),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("role", sa.String(), nullable=True),
+            sa.Column("plan", sa.String(), nullable=True),
+            sa.Column("location", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("acct_type", sa.String(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_users_id", "users", ["id"], unique=True)
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if "events" not in tables:
+        op.create_table(
+            "events",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("location", sa.String(), nullable=True),
+            sa.Column("expected_guests", sa.Integer(), nullable=True),
+            sa.Column("created_by", sa.Integer(), nullable=True),
+            sa.Column("time", sa.String(), nullable=True),
+            sa.Column("image_url", sa.String(), nullable=True),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["created_by"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_events_id", "events", ["id"])
+        op.create_index("ix_events_name", "events", ["name"])
+
+    if "guests" not in tables:
+        op.create_table(
+            "guests",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("tags", sa.String(), nullable=True),
+            sa.Column("email", sa.String(), nullable=True),
+            sa.Column("event_id", sa.Integer(), nullable=True),
+            sa.Column("qr_token", sa.String(), nullable=True),
+            sa.Column("qr_path", sa.String(), nullable=True),
+            sa.ForeignKeyConstraint(["event_id"], ["events.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("qr_token"),
+            sa.UniqueConstraint("qr_path"),
+        )
+        op.create_index("ix_guests_id", "guests", ["id"])
+
+    if "activitylogs" not in tables:
+        op.create_table(
+            "activitylogs",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("event_id", sa.Integer(), nullable=False),
+            sa.Column("guest_id", sa.Integer(), nullable=True),
+            sa.Column("user_id", sa.Integer(), nullable=True),
+            sa.Column("type", sa.String(), nullable=False),
+            sa.Column("description", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.Column("method", sa.String(), nullable=True),
+            sa.Column("activity_data", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["event_id"], ["events.id"]),
+            sa.ForeignKeyConstraint(["guest_id"], ["guests.id"]),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_activitylogs_id", "activitylogs", ["id"])
+
+
+def downgrade():
+    op.drop_table("activitylogs")
+    op.drop_table("guests")
+    op.drop_table("events")
+    op.drop_table("users")
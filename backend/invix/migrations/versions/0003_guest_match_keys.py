@@ -0,0 +1,75 @@
+"""guest match keys for idempotent re-imports
+
+Adds guests.match_key, fills it for existing guests in batches and indexes
+it per event. Not unique: repeated uploads before this revision left
+duplicate guests that a constraint would reject.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+from typing import Optional
+import sqlalchemy as sa
+import hashlib
+import unicodedata
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+# Frozen copy of operations.functions.guest_match_key as of this revision,
+# so the migration neither imports the app nor changes with it
+def guest_match_key(name: Optional[str], email: Optional[str]) -> str:
+    email = unicodedata.normalize("NFKC", email or "").strip().casefold()
+    if email:
+        return f"email:{email}"
+    name = " ".join(unicodedata.normalize("NFKC", name or "").casefold().split())
+    return f"name:{hashlib.sha1(name.encode('utf-8')).hexdigest()}"
+
+
+def upgrade():
+    bind = op.get_bind()
+    op.add_column("guests", sa.Column("match_key", sa.String(), nullable=True))
+
+    guests = sa.table(
+        "guests",
+        sa.column("id", sa.Integer),
+        sa.column("name", sa.String),
+        sa.column("email", sa.String),
+        sa.column("match_key", sa.String),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(guests.c.id, guests.c.name, guests.c.email)
+            .where(guests.c.match_key.is_(None), guests.c.id > last_id)
+            .order_by(guests.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            sa.update(guests)
+            .where(guests.c.id == sa.bindparam("guest_id"))
+            .values(match_key=sa.bindparam("key")),
+            [
+                {"guest_id": row.id, "key": guest_match_key(row.name, row.email)}
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+    op.create_index("ix_guests_event_match_key", "guests", ["event_id", "match_key"])
+
+
+# A plain DROP COLUMN (SQLite 3.35+) rather than a batch table rebuild,
+# which would drop the guests_fts sync triggers on guests
+def downgrade():
+    op.drop_index("ix_guests_event_match_key", table_name="guests")
+    op.drop_column("guests", "match_key")
@@ -0,0 +1,74 @@
+"""attendance state per guest
+
+The table check-ins read and update, keyed by guest. ActivityLog keeps the
+history of scans; guests added before this revision get their state from it.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "attendance",
+        sa.Column("guest_id", sa.Integer(), nullable=False),
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("check_in_at", sa.DateTime(), nullable=True),
+        sa.Column("check_out_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["guest_id"], ["guests.id"]),
+        sa.ForeignKeyConstraint(["event_id"], ["events.id"]),
+        sa.PrimaryKeyConstraint("guest_id"),
+    )
+    op.create_index(
+        "ix_attendance_event_status", "attendance", ["event_id", "status"]
+    )
+    _backfill()
+
+
+# Adds a row for every existing guest, deriving its state from the guest's
+# latest check-in/out activity log. Runs once, new guests get their row when
+# they are inserted.
+def _backfill():
+    op.execute(
+        """
+        INSERT INTO attendance (guest_id, event_id, status, check_in_at, check_out_at)
+        SELECT
+            g.id,
+            g.event_id,
+            COALESCE(
+                (
+                    SELECT CASE l.type WHEN 'check_in' THEN 'checked_in' ELSE 'checked_out' END
+                    FROM activitylogs l
+                    WHERE l.guest_id = g.id AND l.type IN ('check_in', 'check_out')
+                    ORDER BY l.created_at DESC, l.id DESC
+                    LIMIT 1
+                ),
+                'pending'
+            ),
+            (
+                SELECT MAX(l.created_at) FROM activitylogs l
+                WHERE l.guest_id = g.id AND l.type = 'check_in'
+            ),
+            (
+                SELECT MAX(l.created_at) FROM activitylogs l
+                WHERE l.guest_id = g.id AND l.type = 'check_out'
+            )
+        FROM guests g
+        WHERE g.event_id IS NOT NULL
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("ix_attendance_event_status", table_name="attendance")
+    op.drop_table("attendance")
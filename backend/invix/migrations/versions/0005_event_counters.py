@@ -0,0 +1,31 @@
+"""running attendance totals per event
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 09:05:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "event_counters",
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        sa.Column("total_guests", sa.Integer(), nullable=False),
+        sa.Column("checked_in", sa.Integer(), nullable=False),
+        sa.Column("checked_out", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["event_id"], ["events.id"]),
+        sa.PrimaryKeyConstraint("event_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("event_counters")
@@ -0,0 +1,61 @@
+"""FTS5 index for guest search
+
+An external-content FTS5 table over guest name, email and tags, kept in step
+with guests by triggers on every insert, update and delete, bulk ones
+included.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 09:10:00
+
+"""
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Frozen copy of the DDL, later revisions change it with their own statements
+GUEST_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE guests_fts USING fts5(
+        name, email, tags,
+        content='guests', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER guests_fts_ai AFTER INSERT ON guests BEGIN
+        INSERT INTO guests_fts(rowid, name, email, tags)
+        VALUES (new.id, new.name, new.email, new.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER guests_fts_ad AFTER DELETE ON guests BEGIN
+        INSERT INTO guests_fts(guests_fts, rowid, name, email, tags)
+        VALUES ('delete', old.id, old.name, old.email, old.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER guests_fts_au AFTER UPDATE ON guests BEGIN
+        INSERT INTO guests_fts(guests_fts, rowid, name, email, tags)
+        VALUES ('delete', old.id, old.name, old.email, old.tags);
+        INSERT INTO guests_fts(rowid, name, email, tags)
+        VALUES (new.id, new.name, new.email, new.tags);
+    END
+    """,
+]
+
+
+def upgrade():
+    for statement in GUEST_SEARCH_DDL:
+        op.execute(statement)
+    # Index the guests that were added before the index existed
+    op.execute("INSERT INTO guests_fts(guests_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    for trigger in ("guests_fts_au", "guests_fts_ad", "guests_fts_ai"):
+        op.execute(f"DROP TRIGGER {trigger}")
+    op.execute("DROP TABLE guests_fts")
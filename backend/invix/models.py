@@ -1,4 +1,13 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, VARCHAR, DateTime
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Date,
+    ForeignKey,
+    VARCHAR,
+    DateTime,
+    Index,
+)
 from sqlalchemy.orm import relationship
 from uuid import uuid4
 from datetime import datetime
@@ -47,6 +56,8 @@ class Event(Base):
     guests = relationship("Guest", back_populates="event")
     activitylogs = relationship("ActivityLog", back_populates="event")
 
+    __table_args__ = (Index("ix_events_created_by_id", "created_by", "id"),)
+
 
 class Guest(Base):
     __tablename__ = "guests"
@@ -57,10 +68,21 @@ class Guest(Base):
     email = Column(String, default="")
     event_id = Column(Integer, ForeignKey("events.id"))
     qr_token = Column(String, unique=True, default=lambda: str(uuid4()))
-    qr_path = Column(String, default="null", unique=True)
+    # Only set for guests whose QR image was saved at insert time, images are
+    # now rendered on demand from qr_token
+    qr_path = Column(String, nullable=True, unique=True)
+    # Normalized email, or a hash of the normalized name for guests without
+    # one. Re-imports match incoming rows to existing guests on it.
+    match_key = Column(String, nullable=True)
 
     event = relationship("Event", back_populates="guests")
     activitylogs = relationship("ActivityLog", back_populates="guest")
+    attendance = relationship("Attendance", back_populates="guest", uselist=False)
+
+    __table_args__ = (
+        Index("ix_guests_event_id_id", "event_id", "id"),
+        Index("ix_guests_event_match_key", "event_id", "match_key"),
+    )
 
     def __repr__(self):
         return f"<Guest(id={self.id}, name={self.name}, tags={self.tags})>"
@@ -88,13 +110,57 @@ class ActivityLog(Base):
     activity_data = Column(String, nullable=True)
 
     # Timestamps
-    created_at = Column(DateTime, default=datetime.now())
-    updated_at = Column(DateTime, default=datetime.now(), onupdate=datetime.now())
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
     # Relationships
     event = relationship("Event", back_populates="activitylogs")
     guest = relationship("Guest", back_populates="activitylogs")
     user = relationship("User", back_populates="activitylogs")
 
+    __table_args__ = (
+        Index("ix_activitylogs_event_id_id", "event_id", "id"),
+        Index(
+            "ix_activitylogs_event_type_created_at", "event_id", "type", "created_at"
+        ),
+        Index(
+            "ix_activitylogs_guest_type_created_at", "guest_id", "type", "created_at"
+        ),
+    )
+
     def __repr__(self):
         return f"<ActivityLog(id={self.id}, type={self.type}, description={self.description})>"
+
+
+# Current check-in state of each guest. ActivityLog keeps the history, this
+# table is what scans read and update.
+class Attendance(Base):
+    __tablename__ = "attendance"
+
+    guest_id = Column(Integer, ForeignKey("guests.id"), primary_key=True)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    check_in_at = Column(DateTime, nullable=True)
+    check_out_at = Column(DateTime, nullable=True)
+
+    guest = relationship("Guest", back_populates="attendance")
+
+    __table_args__ = (Index("ix_attendance_event_status", "event_id", "status"),)
+
+    def __repr__(self):
+        return f"<Attendance(guest_id={self.guest_id}, status={self.status})>"
+
+
+# Running attendance totals per event, kept in step with guest and scan
+# writes so dashboards read one row instead of counting
+class EventCounter(Base):
+    __tablename__ = "event_counters"
+
+    event_id = Column(Integer, ForeignKey("events.id"), primary_key=True)
+    total_guests = Column(Integer, nullable=False, default=0)
+    checked_in = Column(Integer, nullable=False, default=0)
+    checked_out = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f"<EventCounter(event_id={self.event_id}, total_guests={self.total_guests})>"
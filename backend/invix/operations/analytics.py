@@ -0,0 +1,104 @@
+from datetime import datetime, time, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import Integer, cast, func
+from sqlalchemy.orm import Session
+
+# Local imports
+from models import Event, Guest, ActivityLog
+
+# from ..models import Event, Guest, ActivityLog
+
+# Check-in window around the event's start time when it has one, otherwise
+# the whole event day is used
+EARLY_ARRIVAL = timedelta(hours=2)
+EVENT_DURATION = timedelta(hours=12)
+
+LOG_STATUS = {"check_in": "checked_in", "check_out": "checked_out"}
+
+
+def event_window(event: Event) -> Tuple[datetime, datetime]:
+    try:
+        starts_at = datetime.combine(event.date, time.fromisoformat(event.time))
+        return starts_at - EARLY_ARRIVAL, starts_at + EVENT_DURATION
+    except (TypeError, ValueError):
+        day = datetime.combine(event.date, time.min)
+        return day, day + timedelta(days=1)
+
+
+def _bucket_label(moment: datetime) -> str:
+    hour = moment.hour % 12 or 12
+    suffix = "AM" if moment.hour < 12 else "PM"
+    if moment.minute:
+        return f"{hour}:{moment.minute:02d} {suffix}"
+    return f"{hour} {suffix}"
+
+
+# Counts check-ins per bucket across the event window with one GROUP BY
+def check_in_buckets(db: Session, event: Event, bucket_minutes: int = 60) -> list:
+    start, end = event_window(event)
+    bucket = cast(
+        (
+            func.julianday(ActivityLog.created_at)
+            - func.julianday(start.isoformat(sep=" "))
+        )
+        * (24 * 60 / bucket_minutes),
+        Integer,
+    ).label("bucket")
+    counts = dict(
+        db.query(bucket, func.count(ActivityLog.id))
+        .filter(
+            ActivityLog.event_id == event.id,
+            ActivityLog.type == "check_in",
+            ActivityLog.created_at >= start,
+            ActivityLog.created_at < end,
+        )
+        .group_by(bucket)
+        .all()
+    )
+
+    step = timedelta(minutes=bucket_minutes)
+    buckets = []
+    index = 0
+    moment = start
+    while moment < end:
+        buckets.append(
+            {
+                "hour": _bucket_label(moment),
+                "start": moment.isoformat(),
+                "count": counts.get(index, 0),
+            }
+        )
+        index += 1
+        moment += step
+    return buckets
+
+
+# Newest-first slice of the event's activity log, keyed on id
+def activity_log_page(
+    db: Session, event_id: int, limit: int = 50, before_id: Optional[int] = None
+) -> dict:
+    query = (
+        db.query(ActivityLog, Guest.name)
+        .outerjoin(Guest, Guest.id == ActivityLog.guest_id)
+        .filter(ActivityLog.event_id == event_id)
+    )
+    if before_id is not None:
+        query = query.filter(ActivityLog.id < before_id)
+    rows = query.order_by(ActivityLog.id.desc()).limit(limit + 1).all()
+
+    logs = [
+        {
+            "id": log.id,
+            "guest_name": guest_name,
+            "type": log.type,
+            "status": LOG_STATUS.get(log.type, log.type),
+            "description": log.description,
+            "method": log.method,
+            "timestamp": log.created_at.isoformat() if log.created_at else None,
+        }
+        for log, guest_name in rows[:limit]
+    ]
+    return {
+        "logs": logs,
+        "nextBeforeId": logs[-1]["id"] if len(rows) > limit else None,
+    }
@@ -0,0 +1,70 @@
+from threading import Lock
+from typing import Optional
+from cachetools import TTLCache
+from sqlalchemy import event, inspect
+
+# Local imports
+from models import User
+from schemas import PublicUser
+from variables import AUTH_CACHE_MAX_USERS, AUTH_CACHE_TTL_SECONDS
+
+# from ..models import User
+# from ..schemas import PublicUser
+# from ..variables import AUTH_CACHE_MAX_USERS, AUTH_CACHE_TTL_SECONDS
+
+
+# Resolved users by token subject (email), so authenticated requests skip
+# the users lookup. Entries expire after the TTL and are dropped as soon as
+# the user row changes in this process.
+class UserCache:
+    def __init__(self, max_users: int, ttl_seconds: int):
+        self.hits = 0
+        self.misses = 0
+        self._users: TTLCache = TTLCache(maxsize=max_users, ttl=ttl_seconds)
+        self._lock = Lock()
+
+    def get(self, email: str) -> Optional[PublicUser]:
+        with self._lock:
+            user = self._users.get(email)
+            if user is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return user
+
+    def put(self, user: User) -> PublicUser:
+        public_user = PublicUser.model_validate(user)
+        with self._lock:
+            self._users[public_user.email] = public_user
+        return public_user
+
+    def invalidate(self, email: Optional[str]):
+        with self._lock:
+            self._users.pop(email, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._users),
+                "max_entries": self._users.maxsize,
+                "ttl_seconds": self._users.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+user_cache = UserCache(AUTH_CACHE_MAX_USERS, AUTH_CACHE_TTL_SECONDS)
+
+
+# Any flushed change to a user, including an email change, evicts both the
+# old and the new subject
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target: User):
+    history = inspect(target).attrs.email.history
+    for email in {target.email, *history.deleted}:
+        user_cache.invalidate(email)
@@ -0,0 +1,285 @@
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import update
+import json
+
+# Local imports
+from models import Guest, ActivityLog, Attendance
+from operations.counters import bump_counters
+
+# from ..models import Guest, ActivityLog, Attendance
+# from ..operations.counters import bump_counters
+
+# Scan outcomes
+SUCCESS = "success"
+ALREADY_CHECKED_IN = "already_checked_in"
+NOT_CHECKED_IN = "not_checked_in"
+UNKNOWN_TOKEN = "unknown_token"
+
+
+class IndexedGuest:
+    __slots__ = ("guest_id", "name", "event_id", "qr_token", "status", "check_in_at")
+
+    def __init__(
+        self,
+        guest_id: int,
+        name: str,
+        event_id: int,
+        qr_token: str,
+        status: str = "pending",
+        check_in_at: Optional[datetime] = None,
+    ):
+        self.guest_id = guest_id
+        self.name = name
+        self.event_id = event_id
+        self.qr_token = qr_token
+        self.status = status
+        self.check_in_at = check_in_at
+
+
+# Attendance state per qr_token, so door scans are answered without reads.
+# Writes go through to the database; the index lives in this process only.
+class CheckInIndex:
+    def __init__(self):
+        self._guests: Dict[str, IndexedGuest] = {}
+        self._warm_events = set()
+        self._lock = Lock()
+
+    def is_warm(self, event_id: int) -> bool:
+        return event_id in self._warm_events
+
+    # Loads every guest of the event with its attendance state
+    def warm(self, db: Session, event_id: int) -> int:
+        rows = (
+            db.query(
+                Guest.id,
+                Guest.name,
+                Guest.event_id,
+                Guest.qr_token,
+                Attendance.status,
+                Attendance.check_in_at,
+            )
+            .outerjoin(Attendance, Attendance.guest_id == Guest.id)
+            .filter(Guest.event_id == event_id)
+            .all()
+        )
+        with self._lock:
+            for row in rows:
+                self._guests[row.qr_token] = IndexedGuest(
+                    row.id,
+                    row.name,
+                    row.event_id,
+                    row.qr_token,
+                    row.status or "pending",
+                    row.check_in_at,
+                )
+            self._warm_events.add(event_id)
+        return len(rows)
+
+    def get(self, token: str) -> Optional[IndexedGuest]:
+        return self._guests.get(token)
+
+    # Index hit, or a one-off load of the guest when its event isn't warm
+    def lookup(self, db: Session, token: str) -> Optional[IndexedGuest]:
+        entry = self._guests.get(token)
+        if entry is not None:
+            return entry
+
+        row = (
+            db.query(
+                Guest.id,
+                Guest.name,
+                Guest.event_id,
+                Attendance.status,
+                Attendance.check_in_at,
+            )
+            .outerjoin(Attendance, Attendance.guest_id == Guest.id)
+            .filter(Guest.qr_token == token)
+            .first()
+        )
+        if row is None:
+            return None
+        entry = IndexedGuest(
+            row.id,
+            row.name,
+            row.event_id,
+            token,
+            row.status or "pending",
+            row.check_in_at,
+        )
+        with self._lock:
+            return self._guests.setdefault(token, entry)
+
+    def add(self, event_id: int, guest_id: int, name: str, token: str):
+        if event_id in self._warm_events:
+            with self._lock:
+                self._guests[token] = IndexedGuest(guest_id, name, event_id, token)
+
+    def discard(self, token: str):
+        with self._lock:
+            self._guests.pop(token, None)
+
+    def drop_event(self, event_id: int):
+        with self._lock:
+            self._warm_events.discard(event_id)
+            for token in [
+                token
+                for token, entry in self._guests.items()
+                if entry.event_id == event_id
+            ]:
+                del self._guests[token]
+
+    # Validates and applies a scan under the lock, so two scanners on this
+    # worker can't both check the same guest in. Returns the previous
+    # (status, check_in_at).
+    def transition(
+        self, entry: IndexedGuest, action: str, at: datetime
+    ) -> Tuple[str, Optional[Tuple[str, Optional[datetime]]]]:
+        with self._lock:
+            if action == "check_in" and entry.status == "checked_in":
+                return ALREADY_CHECKED_IN, None
+            if action == "check_out" and entry.status != "checked_in":
+                return NOT_CHECKED_IN, None
+            previous = (entry.status, entry.check_in_at)
+            if action == "check_in":
+                entry.status = "checked_in"
+                entry.check_in_at = at
+            else:
+                entry.status = "checked_out"
+            return SUCCESS, previous
+
+    def restore(self, entry: IndexedGuest, previous: Tuple[str, Optional[datetime]]):
+        with self._lock:
+            entry.status, entry.check_in_at = previous
+
+
+checkin_index = CheckInIndex()
+
+
+# Applies a check-in or check-out scan with a single conditional UPDATE on
+# the attendance row, and stages its activity log. Does not commit; call
+# rollback_scan if the commit fails. Undoes its own index change when the
+# writes fail.
+def record_scan(
+    db: Session,
+    token: str,
+    action: str,
+    user_id: Optional[int],
+    at: Optional[datetime] = None,
+    method: str = "qr_code",
+) -> Tuple[str, Optional[IndexedGuest], Optional[tuple]]:
+    entry = checkin_index.lookup(db, token)
+    if entry is None:
+        return UNKNOWN_TOKEN, None, None
+
+    at = at or datetime.now()
+    outcome, previous = checkin_index.transition(entry, action, at)
+    if outcome != SUCCESS:
+        return outcome, entry, None
+
+    # A failed write must not leave the index ahead of the database, later
+    # scans of the guest would be answered from the wrong state
+    try:
+        applied = _write_scan(db, entry, action, user_id, at, method, previous)
+    except Exception:
+        checkin_index.restore(entry, previous)
+        raise
+    if not applied:
+        # Another worker got there first, reload the guest on the next scan
+        checkin_index.discard(token)
+        return (
+            ALREADY_CHECKED_IN if action == "check_in" else NOT_CHECKED_IN,
+            entry,
+            None,
+        )
+    return SUCCESS, entry, previous
+
+
+# The database side of a scan: the conditional UPDATE, the counters and the
+# activity log. Returns False when the UPDATE matched no row.
+def _write_scan(
+    db: Session,
+    entry: IndexedGuest,
+    action: str,
+    user_id: Optional[int],
+    at: datetime,
+    method: str,
+    previous: tuple,
+) -> bool:
+    # The UPDATE only matches when the guest is still in a state the scan can
+    # move from, so the database settles races between workers too
+    if action == "check_in":
+        statement = (
+            update(Attendance)
+            .where(
+                Attendance.guest_id == entry.guest_id,
+                Attendance.status != "checked_in",
+            )
+            .values(status="checked_in", check_in_at=at, check_out_at=None)
+        )
+    else:
+        statement = (
+            update(Attendance)
+            .where(
+                Attendance.guest_id == entry.guest_id,
+                Attendance.status == "checked_in",
+            )
+            .values(status="checked_out", check_out_at=at)
+        )
+    result = db.execute(statement.execution_options(synchronize_session=False))
+    if result.rowcount == 0:
+        return False
+
+    if action == "check_in":
+        bump_counters(
+            db,
+            entry.event_id,
+            checked_in=1,
+            checked_out=-1 if previous[0] == "checked_out" else 0,
+        )
+    else:
+        bump_counters(db, entry.event_id, checked_in=-1, checked_out=1)
+
+    if action == "check_in":
+        description = f"Guest {entry.name} checked in via QR code"
+        data = {"check_in_time": at.isoformat(), "location": "main entrance"}
+    else:
+        check_in_at = previous[1]
+        description = f"Guest {entry.name} checked out via QR code"
+        data = {
+            "check_out_time": at.isoformat(),
+            "check_in_time": check_in_at.isoformat() if check_in_at else None,
+            # Duration in hours
+            "duration": (
+                (at - check_in_at).total_seconds() / 3600 if check_in_at else None
+            ),
+        }
+
+    db.add(
+        ActivityLog(
+            guest_id=entry.guest_id,
+            event_id=entry.event_id,
+            user_id=user_id,
+            type=action,
+            description=description,
+            status="completed",
+            method=method,
+            activity_data=json.dumps(data),
+            created_at=at,
+        )
+    )
+    return True
+
+
+def rollback_scan(db: Session, entry: IndexedGuest, previous: tuple):
+    rollback_scans(db, [(entry, previous)])
+
+
+# Undoes index changes of scans applied in a transaction that failed
+def rollback_scans(db: Session, applied: List[Tuple[IndexedGuest, tuple]]):
+    db.rollback()
+    for entry, previous in reversed(applied):
+        checkin_index.restore(entry, previous)
+
@@ -0,0 +1,114 @@
+from typing import Optional
+from sqlalchemy import text, update
+from sqlalchemy.orm import Session
+
+# Local imports
+from models import Event, EventCounter
+
+# from ..models import Event, EventCounter
+
+
+# Recomputes counters from the guests and attendance tables. With
+# missing_only it only fills in events that have no counters row yet.
+def rebuild_counters(
+    db: Session, event_id: Optional[int] = None, missing_only: bool = False
+) -> int:
+    conditions = []
+    if event_id is not None:
+        conditions.append("e.id = :event_id")
+    if missing_only:
+        conditions.append(
+            "NOT EXISTS (SELECT 1 FROM event_counters c WHERE c.event_id = e.id)"
+        )
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    result = db.execute(
+        text(
+            f"""
+            INSERT OR REPLACE INTO event_counters
+                (event_id, total_guests, checked_in, checked_out, updated_at)
+            SELECT
+                e.id,
+                (SELECT COUNT(*) FROM guests g WHERE g.event_id = e.id),
+                (
+                    SELECT COUNT(*) FROM attendance a
+                    WHERE a.event_id = e.id AND a.status = 'checked_in'
+                ),
+                (
+                    SELECT COUNT(*) FROM attendance a
+                    WHERE a.event_id = e.id AND a.status = 'checked_out'
+                ),
+                CURRENT_TIMESTAMP
+            FROM events e
+            {where}
+            """
+        ),
+        {"event_id": event_id},
+    )
+    db.commit()
+    return result.rowcount
+
+
+# Applies deltas to an event's counters inside the caller's transaction
+def bump_counters(
+    db: Session,
+    event_id: int,
+    total_guests: int = 0,
+    checked_in: int = 0,
+    checked_out: int = 0,
+):
+    result = db.execute(
+        update(EventCounter)
+        .where(EventCounter.event_id == event_id)
+        .values(
+            total_guests=EventCounter.total_guests + total_guests,
+            checked_in=EventCounter.checked_in + checked_in,
+            checked_out=EventCounter.checked_out + checked_out,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        # No row yet: start it from zero, the deltas above are then applied
+        # by counting the rows the caller has already flushed
+        db.add(EventCounter(event_id=event_id))
+        db.flush()
+        _recount(db, event_id)
+
+
+def _recount(db: Session, event_id: int):
+    db.execute(
+        text(
+            """
+            UPDATE event_counters SET
+                total_guests = (SELECT COUNT(*) FROM guests WHERE event_id = :event_id),
+                checked_in = (
+                    SELECT COUNT(*) FROM attendance
+                    WHERE event_id = :event_id AND status = 'checked_in'
+                ),
+                checked_out = (
+                    SELECT COUNT(*) FROM attendance
+                    WHERE event_id = :event_id AND status = 'checked_out'
+                )
+            WHERE event_id = :event_id
+            """
+        ),
+        {"event_id": event_id},
+    )
+
+
+# One primary-key lookup for the event's attendance summary
+def event_counts(db: Session, event: Event) -> dict:
+    counter = db.get(EventCounter, event.id)
+    if counter is None:
+        rebuild_counters(db, event.id)
+        counter = db.get(EventCounter, event.id)
+
+    expected = event.expected_guests or 0
+    return {
+        "checkedIn": counter.checked_in,
+        "checkedOut": counter.checked_out,
+        "pending": counter.total_guests - counter.checked_in - counter.checked_out,
+        "totalGuests": counter.total_guests,
+        "expectedGuests": expected,
+        "occupancy": counter.checked_in,
+        "occupancyRate": round(counter.checked_in / expected, 4) if expected else None,
+    }
@@ -0,0 +1,71 @@
+from typing import Iterator, List
+from sqlalchemy import select
+import csv
+import io
+import json
+
+# Local imports
+from database import SessionLocal
+from models import Guest, ActivityLog
+
+# from ..database import SessionLocal
+# from ..models import Guest, ActivityLog
+
+# Rows fetched from the cursor, and written to the client, at a time
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+GUEST_EXPORT_COLUMNS = [Guest.id, Guest.name, Guest.email, Guest.tags, Guest.qr_token]
+LOG_EXPORT_COLUMNS = [
+    ActivityLog.id,
+    ActivityLog.guest_id,
+    ActivityLog.user_id,
+    ActivityLog.type,
+    ActivityLog.description,
+    ActivityLog.status,
+    ActivityLog.method,
+    ActivityLog.activity_data,
+    ActivityLog.created_at,
+]
+
+
+def _csv_chunk(rows: List) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+# Streams the selected columns as NDJSON or CSV straight off a server-side
+# cursor, as plain rows without building ORM objects. It opens its own
+# session since the request's one is closed before the body is sent.
+def stream_rows(columns: List, where, export_format: str) -> Iterator[str]:
+    names = [column.key for column in columns]
+    statement = (
+        select(*columns)
+        .where(where)
+        .order_by(columns[0])
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if export_format == "csv":
+        yield _csv_chunk([names])
+
+    with SessionLocal() as db:
+        for rows in db.execute(statement).partitions():
+            if export_format == "csv":
+                yield _csv_chunk(rows)
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(names, row)), default=str) + "\n"
+                    for row in rows
+                )
+
+
+def stream_guests(event_id: int, export_format: str) -> Iterator[str]:
+    return stream_rows(GUEST_EXPORT_COLUMNS, Guest.event_id == event_id, export_format)
+
+
+def stream_activity_logs(event_id: int, export_format: str) -> Iterator[str]:
+    return stream_rows(
+        LOG_EXPORT_COLUMNS, ActivityLog.event_id == event_id, export_format
+    )
@@ -1,28 +1,34 @@
 from fastapi import Depends, HTTPException, Request
 from sqlalchemy.orm import Session
+from sqlalchemy import insert
 from jose import JWTError, jwt
-import qrcode
-import os
+from typing import Iterable, List, Optional
+import hashlib
+import unicodedata
 import uuid
+import json
 
 # Local imports
-from models import Event, Guest
-from schemas import EventCreate, Guest as GuestSchema
+from models import Event, Guest, ActivityLog, Attendance, EventCounter
+from schemas import EventCreate, Guest as GuestSchema, PublicUser
 from models import User, Guest
-from database import SessionLocal
+from database import get_db
 from variables import ALGORITHM, SECRET_KEY
-# from ..models import Event, Guest
-# from ..schemas import EventCreate, Guest as GuestSchema
+from operations.checkin import checkin_index
+from operations.counters import bump_counters
+from operations.typeahead import typeahead_index
+from operations.pagination import paginate
+from operations.auth_cache import user_cache
+# from ..models import Event, Guest, ActivityLog, Attendance, EventCounter
+# from ..schemas import EventCreate, Guest as GuestSchema, PublicUser
 # from ..models import User, Guest
-# from ..database import SessionLocal
+# from ..database import get_db
 # from ..variables import ALGORITHM, SECRET_KEY
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# from ..operations.checkin import checkin_index
+# from ..operations.counters import bump_counters
+# from ..operations.typeahead import typeahead_index
+# from ..operations.pagination import paginate
+# from ..operations.auth_cache import user_cache
 
 
 def create_event(db: Session, event: EventCreate, user_id: int):
@@ -36,13 +42,15 @@ def create_event(db: Session, event: EventCreate, user_id: int):
         image_url=event.image_url,
     )
     db.add(db_event)
+    db.flush()
+    db.add(EventCounter(event_id=db_event.id))
     db.commit()
     db.refresh(db_event)
     return db_event
 
 
-def get_events(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(Event).offset(skip).limit(limit).all()
+def get_events(db: Session, cursor: Optional[str] = None, limit: int = 10):
+    return paginate(db.query(Event), Event.id, cursor, limit)
 
 
 def add_guests_to_event(db: Session, event_id: int, uuid: str, guest: GuestSchema):
@@ -50,23 +58,27 @@ def add_guests_to_event(db: Session, event_id: int, uuid: str, guest: GuestSchem
     if not db_event:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    filepath = generate_qr_code(uuid)
     db_guest = Guest(
         name=guest.name,
         tags=guest.tags,
         email=guest.email,
         event_id=db_event.id,
         qr_token=uuid,
-        qr_path=filepath,
+        match_key=guest_match_key(guest.name, guest.email),
+        attendance=Attendance(event_id=db_event.id),
     )
     db.add(db_guest)
+    bump_counters(db, db_event.id, total_guests=1)
 
     db.commit()
+    checkin_index.add(db_event.id, db_guest.id, db_guest.name, db_guest.qr_token)
+    typeahead_index.invalidate(db_event.id)
     return db_guest
 
 
-# Fetches current authenticated user from the JWT token
-def fetch_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+# Fetches current authenticated user from the JWT token, from the user cache
+# when it was seen recently
+def fetch_current_user(request: Request, db: Session = Depends(get_db)) -> PublicUser:
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
@@ -76,41 +88,118 @@ def fetch_current_user(request: Request, db: Session = Depends(get_db)) -> User:
         if email is None:
             raise HTTPException(status_code=401, detail="Invalid token payload")
 
+        user = user_cache.get(email)
+        if user is not None:
+            return user
+
         user = db.query(User).filter(User.email == email).first()
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
 
-        return user
+        return user_cache.put(user)
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
-def add_bulk_guests_to_event(db: Session, event_id: int, guests: GuestSchema):
+# The current user, refused unless they have the admin role
+def fetch_admin_user(
+    current_user: PublicUser = Depends(fetch_current_user),
+) -> PublicUser:
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+
+def get_event_or_404(db: Session, event_id: int) -> Event:
+    db_event = db.query(Event).filter(Event.id == event_id).first()
+    if not db_event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return db_event
+
+
+# Identity of a guest within its event for re-imports: the normalized email,
+# or a hash of the normalized name when there is no email
+def guest_match_key(name: Optional[str], email: Optional[str]) -> str:
+    email = unicodedata.normalize("NFKC", email or "").strip().casefold()
+    if email:
+        return f"email:{email}"
+    name = " ".join(unicodedata.normalize("NFKC", name or "").casefold().split())
+    return f"name:{hashlib.sha1(name.encode('utf-8')).hexdigest()}"
+
+
+# Stages a batch of guests with one multi-row INSERT. Does not commit, the
+# caller owns the transaction.
+def insert_guests(db: Session, event_id: int, guests: Iterable[GuestSchema]):
+    rows = []
     for guest in guests:
-        if not guest.name or not guest.tags:
-            raise HTTPException(
-                status_code=400, detail="Guest name and tags cannot be empty"
-            )
-    add_guests_to_event(db=db, event_id=event_id, guests=guests, uuid=str(uuid.uuid4()))
-    all_guests = db.query(Guest).filter(Guest.event_id == event_id).all()
-    return all_guests
-
-
-def generate_qr_code(data: str):
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
+        if not guest.name:
+            raise HTTPException(status_code=400, detail="Guest name cannot be empty")
+        rows.append(
+            {
+                "name": guest.name,
+                "tags": guest.tags,
+                "email": guest.email,
+                "event_id": event_id,
+                "qr_token": str(uuid.uuid4()),
+                "match_key": guest_match_key(guest.name, guest.email),
+            }
+        )
+    if not rows:
+        return []
+
+    # Plain rows rather than ORM instances, so nothing expires on commit and
+    # reading them back doesn't trigger a SELECT per guest.
+    new_guests = db.execute(
+        insert(Guest).returning(
+            Guest.id, Guest.name, Guest.tags, Guest.email, Guest.qr_token
+        ),
+        rows,
+    ).all()
+    db.execute(
+        insert(Attendance),
+        [{"guest_id": guest.id, "event_id": event_id} for guest in new_guests],
+    )
+    bump_counters(db, event_id, total_guests=len(new_guests))
+    return new_guests
+
+
+def log_bulk_import(
+    db: Session,
+    event_id: int,
+    guests_added: int,
+    user_id: Optional[int] = None,
+    file_type: Optional[str] = None,
+):
+    if not guests_added:
+        return
+    db.add(
+        ActivityLog(
+            event_id=event_id,
+            user_id=user_id,
+            type="guest_list_updated",
+            description=f"Added {guests_added} guests via file upload",
+            status="completed",
+            method="bulk_import",
+            activity_data=json.dumps(
+                {"file_type": file_type, "guests_added": guests_added}
+            ),
+        )
     )
-    qr.add_data(data)
-    qr.make(fit=True)
 
-    img = qr.make_image(fill_color="black", back_color="white")
 
-    save_dir = "static/qr_codes"
-    os.makedirs(save_dir, exist_ok=True)
-    file_path = os.path.join(save_dir, f"{data}.png")
-    img.save(file_path)
+def add_bulk_guests_to_event(
+    db: Session,
+    event_id: int,
+    guests: Iterable[GuestSchema],
+    user_id: Optional[int] = None,
+    file_type: Optional[str] = None,
+) -> List:
+    db_event = get_event_or_404(db, event_id)
+    new_guests = insert_guests(db, db_event.id, guests)
 
-    return file_path
+    log_bulk_import(db, db_event.id, len(new_guests), user_id, file_type)
+    db.commit()
+    for guest in new_guests:
+        checkin_index.add(db_event.id, guest.id, guest.name, guest.qr_token)
+    typeahead_index.invalidate(db_event.id)
+    return new_guests
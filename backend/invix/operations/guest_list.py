@@ -0,0 +1,435 @@
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from typing import Dict, Iterator, List, Optional, Tuple
+import codecs
+import csv
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+# Local imports
+from database import SessionLocal
+from schemas import Guest as GuestSchema
+from variables import (
+    GUEST_LIST_MAX_BYTES,
+    GUEST_LIST_MAX_ROWS,
+    GUEST_LIST_BATCH_SIZE,
+    JOB_HISTORY_SIZE,
+)
+from models import Guest
+from operations.functions import (
+    get_event_or_404,
+    insert_guests,
+    log_bulk_import,
+    guest_match_key,
+)
+from operations.checkin import checkin_index
+from operations.jobs import jobs
+from operations.live import live_hub
+from operations.typeahead import typeahead_index
+
+# from ..database import SessionLocal
+# from ..schemas import Guest as GuestSchema
+# from ..variables import (
+#     GUEST_LIST_MAX_BYTES,
+#     GUEST_LIST_MAX_ROWS,
+#     GUEST_LIST_BATCH_SIZE,
+#     JOB_HISTORY_SIZE,
+# )
+# from ..models import Guest
+# from ..operations.functions import (
+#     get_event_or_404,
+#     insert_guests,
+#     log_bulk_import,
+#     guest_match_key,
+# )
+# from ..operations.checkin import checkin_index
+# from ..operations.jobs import jobs
+# from ..operations.live import live_hub
+# from ..operations.typeahead import typeahead_index
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx", ".xls")
+
+# Read buffer for the CSV text stream
+CSV_CHUNK_SIZE = 64 * 1024
+
+
+def file_type_of(file: UploadFile) -> str:
+    return os.path.splitext(file.filename or "")[1].lower().lstrip(".")
+
+
+def _upload_size(file: UploadFile) -> int:
+    if file.size is not None:
+        return file.size
+    current = file.file.tell()
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(current)
+    return size
+
+
+# Decodes the upload chunk by chunk and yields it line by line
+def _iter_lines(stream) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    for chunk in iter(lambda: stream.read(CSV_CHUNK_SIZE), b""):
+        *lines, pending = (pending + decoder.decode(chunk)).split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _iter_csv_rows(stream) -> Iterator[dict]:
+    yield from csv.DictReader(_iter_lines(stream))
+
+
+def _iter_xlsx_rows(stream) -> Iterator[dict]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+# Legacy .xls has no streaming reader, the size limit bounds this one
+def _iter_xls_rows(stream) -> Iterator[dict]:
+    import xlrd
+
+    workbook = xlrd.open_workbook(file_contents=stream.read(), on_demand=True)
+    try:
+        sheet = workbook.sheet_by_index(0)
+        if sheet.nrows == 0:
+            return
+        header = sheet.row_values(0)
+        for index in range(1, sheet.nrows):
+            yield dict(zip(header, sheet.row_values(index)))
+    finally:
+        workbook.release_resources()
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def normalize_row(row: dict) -> Optional[GuestSchema]:
+    values = {_cell(key).lower(): _cell(value) for key, value in row.items() if key}
+    if not any(values.values()):
+        return None
+    return GuestSchema(
+        name=values.get("name", ""),
+        tags=values.get("tags", ""),
+        email=values.get("email", ""),
+    )
+
+
+# Parses a guest list file row by row, yielding (row number, guest) for
+# every non-blank row. Names are not checked here.
+def iter_guest_rows(
+    stream, file_type: str, max_rows: int = GUEST_LIST_MAX_ROWS
+) -> Iterator[Tuple[int, GuestSchema]]:
+    if file_type == "csv":
+        rows = _iter_csv_rows(stream)
+    elif file_type == "xlsx":
+        rows = _iter_xlsx_rows(stream)
+    else:
+        rows = _iter_xls_rows(stream)
+
+    # Row 1 is the header
+    for line, row in enumerate(rows, start=2):
+        if line - 1 > max_rows:
+            raise ValueError(f"Guest list has more than {max_rows} rows")
+        guest = normalize_row(row)
+        if guest is not None:
+            yield line, guest
+
+
+# Guest list imports by id. Like the other job state, progress is kept in
+# this process only.
+import_jobs: "OrderedDict[str, dict]" = OrderedDict()
+_import_lock = Lock()
+
+# Failed rows listed in an import's status, the count covers all of them
+MAX_REPORTED_FAILURES = 100
+
+
+# Drops the oldest finished imports beyond JOB_HISTORY_SIZE. Queued and
+# running ones are kept, their job still needs them. Call under the lock.
+def _trim_imports():
+    excess = len(import_jobs) - JOB_HISTORY_SIZE
+    if excess <= 0:
+        return
+    finished = [
+        import_id
+        for import_id, job in import_jobs.items()
+        if job["status"] in ("completed", "failed")
+    ]
+    for import_id in finished[:excess]:
+        del import_jobs[import_id]
+
+
+def get_import_job(import_id: str) -> Optional[dict]:
+    with _import_lock:
+        job = import_jobs.get(import_id)
+        if job is None:
+            return None
+        return {**job, "failures": list(job["failures"])}
+
+
+# Refuses an upload of the wrong type or size, returns its file type
+def check_guest_list(file: UploadFile) -> str:
+    file_type = file_type_of(file)
+    if f".{file_type}" not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Unsupported guest list file type")
+
+    if _upload_size(file) > GUEST_LIST_MAX_BYTES:
+        max_mb = GUEST_LIST_MAX_BYTES // (1024 * 1024)
+        raise HTTPException(
+            status_code=413,
+            detail=f"Guest list file is larger than {max_mb} MB",
+        )
+    return file_type
+
+
+# Checks the upload, saves it to a temporary file and queues its import.
+# Returns the import's status right away.
+def start_guest_import(
+    event_id: int,
+    file: UploadFile,
+    user_id: Optional[int] = None,
+    mode: str = "append",
+) -> dict:
+    file_type = check_guest_list(file)
+
+    file.file.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=f".{file_type}", delete=False) as upload:
+        shutil.copyfileobj(file.file, upload)
+
+    job = {
+        "id": str(uuid.uuid4()),
+        "event_id": event_id,
+        "user_id": user_id,
+        "file_name": file.filename,
+        "mode": mode,
+        "status": "queued",
+        "rows_processed": 0,
+        "rows_inserted": 0,
+        "rows_updated": 0,
+        "rows_unchanged": 0,
+        "rows_failed": 0,
+        "failures": [],
+        "rows_per_second": 0.0,
+        "error": None,
+        "started_at": None,
+        "finished_at": None,
+    }
+    with _import_lock:
+        import_jobs[job["id"]] = job
+        _trim_imports()
+
+    try:
+        jobs.submit(
+            "import_guest_list",
+            run_guest_import,
+            job["id"],
+            event_id,
+            upload.name,
+            file_type,
+            user_id,
+            mode,
+        )
+    except HTTPException:
+        os.remove(upload.name)
+        with _import_lock:
+            import_jobs.pop(job["id"], None)
+        raise
+    return get_import_job(job["id"])
+
+
+def _fail_row(job: dict, line: int, reason: str):
+    with _import_lock:
+        job["rows_processed"] += 1
+        job["rows_failed"] += 1
+        if len(job["failures"]) < MAX_REPORTED_FAILURES:
+            job["failures"].append({"row": line, "reason": reason})
+
+
+def _guest_fields(guest) -> Tuple[str, str, str]:
+    return (guest.name or "", guest.tags or "", guest.email or "")
+
+
+# Splits a chunk into guests to insert and updates to existing guests,
+# with one SELECT for the whole chunk. Returns (new guests, updates,
+# tokens of updated guests, updated row count, unchanged row count). Rows
+# repeating a guest that is new in this chunk count toward neither.
+def _match_batch(db: Session, event_id: int, guests: List[GuestSchema]):
+    keyed = [(guest_match_key(guest.name, guest.email), guest) for guest in guests]
+    existing = {}
+    for row in db.execute(
+        select(
+            Guest.id,
+            Guest.match_key,
+            Guest.name,
+            Guest.tags,
+            Guest.email,
+            Guest.qr_token,
+        ).where(
+            Guest.event_id == event_id,
+            Guest.match_key.in_(list({key for key, _ in keyed})),
+        )
+    ):
+        # The oldest guest wins when earlier uploads left duplicates. Sorting
+        # in SQL would make SQLite walk the whole event by id instead.
+        if row.match_key not in existing or row.id < existing[row.match_key].id:
+            existing[row.match_key] = row
+
+    new_guests: Dict[str, GuestSchema] = {}
+    updates: Dict[int, dict] = {}
+    updated_tokens = []
+    updated = unchanged = 0
+    for key, guest in keyed:
+        fields = _guest_fields(guest)
+        row = existing.get(key)
+        if row is None:
+            # Repeated rows in the file update the pending guest
+            pending = new_guests.get(key)
+            if pending is not None and _guest_fields(pending) == fields:
+                unchanged += 1
+            new_guests[key] = guest
+            continue
+        current = updates.get(row.id)
+        if current is not None:
+            current = (current["name"], current["tags"], current["email"])
+        if fields == (current or _guest_fields(row)):
+            unchanged += 1
+            continue
+        name, tags, email = fields
+        updated += 1
+        updates[row.id] = {
+            "id": row.id,
+            "name": name,
+            "tags": tags,
+            "email": email,
+            "match_key": key,
+        }
+        if row.qr_token not in updated_tokens:
+            updated_tokens.append(row.qr_token)
+    return (
+        list(new_guests.values()),
+        list(updates.values()),
+        updated_tokens,
+        updated,
+        unchanged,
+    )
+
+
+# Writes and commits one chunk, so a later failure keeps what came before.
+# append adds every row as a new guest; upsert matches rows to the event's
+# guests on their match key, updates the changed ones and adds the rest.
+def _commit_batch(
+    db: Session, job: dict, event_id: int, batch: List[tuple], mode: str = "append"
+):
+    guests = [guest for _, guest in batch]
+    updates, updated_tokens, updated, unchanged = [], [], 0, 0
+    try:
+        if mode == "upsert":
+            guests, updates, updated_tokens, updated, unchanged = _match_batch(
+                db, event_id, guests
+            )
+        new_guests = insert_guests(db, event_id, guests)
+        if updates:
+            db.execute(update(Guest), updates)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        # The error can quote SQL and guest values, it is only logged
+        logging.error(f"Guest list import {job['id']} chunk failed: {str(e)}")
+        for line, _ in batch:
+            _fail_row(job, line, "database error")
+        return
+
+    with _import_lock:
+        job["rows_processed"] += len(batch)
+        job["rows_inserted"] += len(new_guests)
+        job["rows_updated"] += updated
+        job["rows_unchanged"] += unchanged
+    for guest in new_guests:
+        checkin_index.add(event_id, guest.id, guest.name, guest.qr_token)
+    # Reloaded with their new name on the next scan
+    for token in updated_tokens:
+        checkin_index.discard(token)
+    typeahead_index.invalidate(event_id)
+    if new_guests:
+        live_hub.publish(event_id, "guests_added", {"count": len(new_guests)})
+    if updates:
+        live_hub.publish(event_id, "guests_updated", {"count": len(updates)})
+
+
+# Runs an import on a job worker, committing every GUEST_LIST_BATCH_SIZE
+# rows. Rows without a name are reported and skipped. Never raises, a retry
+# would insert the committed chunks twice.
+def run_guest_import(
+    import_id: str,
+    event_id: int,
+    path: str,
+    file_type: str,
+    user_id: Optional[int] = None,
+    mode: str = "append",
+):
+    job = import_jobs[import_id]
+    job["status"] = "running"
+    job["started_at"] = datetime.now().isoformat()
+    started = time.perf_counter()
+    try:
+        with SessionLocal() as db, open(path, "rb") as stream:
+            get_event_or_404(db, event_id)
+            batch = []
+            for line, guest in iter_guest_rows(stream, file_type):
+                if not guest.name:
+                    _fail_row(job, line, "Guest name cannot be empty")
+                    continue
+                batch.append((line, guest))
+                if len(batch) >= GUEST_LIST_BATCH_SIZE:
+                    _commit_batch(db, job, event_id, batch, mode)
+                    job["rows_per_second"] = round(
+                        job["rows_processed"] / (time.perf_counter() - started), 1
+                    )
+                    batch = []
+            if batch:
+                _commit_batch(db, job, event_id, batch, mode)
+
+            log_bulk_import(db, event_id, job["rows_inserted"], user_id, file_type)
+            db.commit()
+        job["status"] = "completed"
+    except Exception as e:
+        logging.error(f"Guest list import {import_id} failed: {str(e)}")
+        job["status"] = "failed"
+        job["error"] = getattr(e, "detail", None) or str(e)
+    finally:
+        elapsed = time.perf_counter() - started
+        if elapsed:
+            job["rows_per_second"] = round(job["rows_processed"] / elapsed, 1)
+        job["finished_at"] = datetime.now().isoformat()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,53 @@
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from fastapi import Request, Response
+import os
+
+# Local imports
+from variables import HTTP_CACHE_POLICIES
+
+# from ..variables import HTTP_CACHE_POLICIES
+
+
+def cache_policy(route: str) -> str:
+    return HTTP_CACHE_POLICIES.get(route, "no-cache")
+
+
+# ETag and mtime from the file's metadata, the content is never read
+def file_validators(path: str) -> Tuple[str, float]:
+    stat = os.stat(path)
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', stat.st_mtime
+
+
+def cache_headers(
+    route: str, etag: str, last_modified: Optional[float] = None, **extra: str
+) -> dict:
+    headers = {"ETag": etag, "Cache-Control": cache_policy(route), **extra}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+# Whether the client's copy is current. If-Modified-Since only counts when
+# there is no If-None-Match, as RFC 9110 says.
+def is_fresh(
+    request: Request, etag: str, last_modified: Optional[float] = None
+) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have whole seconds
+        return int(last_modified) <= since
+    return False
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
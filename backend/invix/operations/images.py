@@ -0,0 +1,161 @@
+from io import BytesIO
+from threading import Lock
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from PIL import Image, ImageOps, UnidentifiedImageError
+import logging
+import mimetypes
+import os
+
+# Local imports
+from operations.jobs import jobs, FatalJobError
+from operations.qrcodes import write_atomic
+
+# from ..operations.jobs import jobs, FatalJobError
+# from ..operations.qrcodes import write_atomic
+
+EVENT_IMAGE_DIR = "static/events"
+
+# Bounding boxes of the resized variants. Thumbnails back the event list,
+# cards the event pages.
+IMAGE_VARIANTS = {
+    "thumb": (256, 256),
+    "card": (960, 960),
+    "full": (2048, 2048),
+}
+VARIANT_FORMATS = {"webp": ("WEBP", "image/webp"), "jpg": ("JPEG", "image/jpeg")}
+VARIANT_QUALITY = 82
+
+# Images whose variants are being rendered, so a burst of requests for a
+# legacy image queues one job
+_pending = set()
+# Images Pillow couldn't decode. They are served as uploaded and never
+# queued again.
+_undecodable = set()
+_pending_lock = Lock()
+
+# What Pillow raises for a file it can't read as an image
+DECODE_ERRORS = (UnidentifiedImageError, Image.DecompressionBombError, OSError)
+
+
+def image_stem(image_url: str) -> str:
+    return os.path.splitext(os.path.basename(image_url))[0]
+
+
+def variant_path(image_url: str, size: str, extension: str) -> str:
+    return os.path.join(EVENT_IMAGE_DIR, f"{image_stem(image_url)}_{size}.{extension}")
+
+
+# Refuses an upload Pillow can't decode
+def check_event_image(content: bytes):
+    try:
+        with Image.open(BytesIO(content)) as image:
+            image.verify()
+    except Exception:
+        raise HTTPException(
+            status_code=400, detail="The event image is not a valid image file"
+        )
+
+
+def render_variants(content: bytes) -> dict:
+    with Image.open(BytesIO(content)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        rendered = {}
+        for size, box in IMAGE_VARIANTS.items():
+            variant = image.copy()
+            variant.thumbnail(box, Image.LANCZOS)
+            for extension, (image_format, _) in VARIANT_FORMATS.items():
+                # JPEG has no alpha, flatten onto white
+                if image_format == "JPEG" and variant.mode == "RGBA":
+                    flat = Image.new("RGB", variant.size, "white")
+                    flat.paste(variant, mask=variant.getchannel("A"))
+                    output = flat
+                else:
+                    output = variant
+                buffer = BytesIO()
+                output.save(buffer, format=image_format, quality=VARIANT_QUALITY)
+                rendered[(size, extension)] = buffer.getvalue()
+        return rendered
+
+
+# Job: writes each variant of an event image, next to the original. An
+# image that can't be decoded fails for good, a retry would fail the same.
+def write_image_variants(image_url: str, content: bytes):
+    try:
+        try:
+            variants = render_variants(content)
+        except DECODE_ERRORS as e:
+            with _pending_lock:
+                _undecodable.add(image_url)
+            raise FatalJobError(f"Cannot decode event image {image_url}: {e}")
+        for (size, extension), data in variants.items():
+            write_atomic(variant_path(image_url, size, extension), data)
+    finally:
+        with _pending_lock:
+            _pending.discard(image_url)
+
+
+# Job: saves an uploaded event image, then its variants
+def save_event_image(image_url: str, content: bytes):
+    write_atomic(os.path.join(EVENT_IMAGE_DIR, image_url), content)
+    write_image_variants(image_url, content)
+
+
+# Renders the variants of an image uploaded before they existed
+def queue_image_variants(image_url: str):
+    with _pending_lock:
+        if image_url in _pending or image_url in _undecodable:
+            return
+        _pending.add(image_url)
+    try:
+        with open(os.path.join(EVENT_IMAGE_DIR, image_url), "rb") as f:
+            content = f.read()
+    except OSError as e:
+        logging.error(f"Failed to read event image {image_url}: {str(e)}")
+        content = None
+    if content is None or not jobs.submit(
+        "event_image_variants",
+        write_image_variants,
+        image_url,
+        content,
+        required=False,
+    ):
+        with _pending_lock:
+            _pending.discard(image_url)
+
+
+# Path and media type of the image to serve: the requested variant in WebP
+# when the client takes it, else JPEG, else the original while the variants
+# are still being rendered. The flag is set in that last case. Images with
+# no variants to come are served as uploaded.
+def resolve_event_image(
+    image_url: str, size: str, accepts_webp: bool
+) -> Optional[Tuple[str, str, bool]]:
+    if size != "original":
+        extensions = ["webp", "jpg"] if accepts_webp else ["jpg"]
+        for extension in extensions:
+            path = variant_path(image_url, size, extension)
+            if os.path.exists(path):
+                return path, VARIANT_FORMATS[extension][1], False
+
+    original = os.path.join(EVENT_IMAGE_DIR, image_url)
+    if not os.path.exists(original):
+        return None
+    pending = size != "original" and image_url not in _undecodable
+    if pending:
+        queue_image_variants(image_url)
+    media_type = mimetypes.guess_type(original)[0] or "application/octet-stream"
+    return original, media_type, pending
+
+
+def remove_event_images(image_url: str):
+    paths = [os.path.join(EVENT_IMAGE_DIR, image_url)]
+    for size in IMAGE_VARIANTS:
+        for extension in VARIANT_FORMATS:
+            paths.append(variant_path(image_url, size, extension))
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
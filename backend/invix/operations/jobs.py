@@ -0,0 +1,188 @@
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock, Thread
+from typing import Callable, Optional
+from fastapi import HTTPException
+import logging
+import queue
+import time
+import uuid
+
+# Local imports
+from variables import (
+    JOB_WORKERS,
+    JOB_QUEUE_SIZE,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_DELAY_SECONDS,
+    JOB_HISTORY_SIZE,
+)
+
+# from ..variables import (
+#     JOB_WORKERS,
+#     JOB_QUEUE_SIZE,
+#     JOB_MAX_ATTEMPTS,
+#     JOB_RETRY_DELAY_SECONDS,
+#     JOB_HISTORY_SIZE,
+# )
+
+
+# Raised by a job whose failure a retry can't fix, a corrupt input say. The
+# job fails right away instead of being retried.
+class FatalJobError(Exception):
+    pass
+
+
+# Bounded queue of background jobs (file writes, deletes, renders) run by a
+# pool of worker threads. A failing job is retried with exponential backoff.
+# Pending jobs and the most recent finished ones are kept for inspection.
+# Jobs live in this process only, like the other in-memory state of the
+# single API worker.
+class JobQueue:
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        max_attempts: int,
+        retry_delay: float,
+        history_size: int,
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.history_size = history_size
+        self.counts = {
+            "submitted": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retried": 0,
+            "rejected": 0,
+        }
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._threads = []
+        self._lock = Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.workers):
+                thread = Thread(
+                    target=self._work, name=f"job-worker-{number}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    # Lets the workers finish what is queued, then stops them
+    def stop(self, timeout: float = 30):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    # Queues func(*args). When the queue is full a required job is refused
+    # with a 503, an optional one (a cache write, say) is dropped.
+    def submit(
+        self, name: str, func: Callable, *args, required: bool = True
+    ) -> Optional[str]:
+        self.start()
+        job = {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "status": "queued",
+            "attempts": 0,
+            "error": None,
+            "queued_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        try:
+            self._queue.put_nowait((job, func, args))
+        except queue.Full:
+            with self._lock:
+                self.counts["rejected"] += 1
+            if required:
+                raise HTTPException(
+                    status_code=503, detail="Background queue is full, try again"
+                )
+            return None
+
+        with self._lock:
+            self.counts["submitted"] += 1
+            self._jobs[job["id"]] = job
+            self._trim()
+        return job["id"]
+
+    # Drops the oldest finished jobs beyond history_size. Queued and running
+    # jobs are always kept, so their status can be polled until they finish.
+    def _trim(self):
+        excess = len(self._jobs) - self.history_size
+        if excess <= 0:
+            return
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["status"] in ("succeeded", "failed")
+        ]
+        for job_id in finished[:excess]:
+            del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            job, func, args = item
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+            while True:
+                job["attempts"] += 1
+                try:
+                    func(*args)
+                    job["status"] = "succeeded"
+                    break
+                except FatalJobError as e:
+                    logging.error(f"Job {job['name']} failed: {str(e)}")
+                    job["error"] = str(e)
+                    job["status"] = "failed"
+                    break
+                except Exception as e:
+                    job["error"] = str(e)
+                    if job["attempts"] >= self.max_attempts:
+                        logging.error(f"Job {job['name']} failed: {str(e)}")
+                        job["status"] = "failed"
+                        break
+                    with self._lock:
+                        self.counts["retried"] += 1
+                    job["status"] = "retrying"
+                    time.sleep(self.retry_delay * 2 ** (job["attempts"] - 1))
+            job["finished_at"] = datetime.now().isoformat()
+            with self._lock:
+                self.counts[job["status"]] += 1
+                self._trim()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "queued": self._queue.qsize(),
+                "queue_size": self._queue.maxsize,
+                **self.counts,
+                "recent": [dict(job) for job in reversed(self._jobs.values())],
+            }
+
+
+jobs = JobQueue(
+    JOB_WORKERS,
+    JOB_QUEUE_SIZE,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_DELAY_SECONDS,
+    JOB_HISTORY_SIZE,
+)
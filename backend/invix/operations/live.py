@@ -0,0 +1,99 @@
+from datetime import datetime
+from threading import Lock
+from typing import Dict, Optional, Set
+from fastapi import HTTPException, Request
+import asyncio
+import json
+
+# Local imports
+from variables import (
+    LIVE_MAX_CONNECTIONS_PER_EVENT,
+    LIVE_HEARTBEAT_SECONDS,
+    LIVE_QUEUE_SIZE,
+)
+
+# from ..variables import (
+#     LIVE_MAX_CONNECTIONS_PER_EVENT,
+#     LIVE_HEARTBEAT_SECONDS,
+#     LIVE_QUEUE_SIZE,
+# )
+
+
+# Fans committed attendance changes out to the Server-Sent Events streams
+# open for each event. publish() is safe to call from the threadpool that
+# runs the sync routes.
+class LiveHub:
+    def __init__(self, max_per_event: int, queue_size: int):
+        self.max_per_event = max_per_event
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = Lock()
+
+    def subscribe(self, event_id: int) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        with self._lock:
+            queues = self._subscribers.setdefault(event_id, set())
+            if len(queues) >= self.max_per_event:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many live connections for this event",
+                )
+            queue = asyncio.Queue(maxsize=self.queue_size)
+            queues.add(queue)
+        return queue
+
+    def unsubscribe(self, event_id: int, queue: asyncio.Queue):
+        with self._lock:
+            queues = self._subscribers.get(event_id)
+            if queues is None:
+                return
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[event_id]
+
+    def connections(self, event_id: int) -> int:
+        return len(self._subscribers.get(event_id, ()))
+
+    def publish(self, event_id: int, kind: str, data: dict):
+        if self._loop is None or event_id not in self._subscribers:
+            return
+        message = {
+            "type": kind,
+            "event_id": event_id,
+            "at": datetime.now().isoformat(),
+            "data": data,
+        }
+        self._loop.call_soon_threadsafe(self._deliver, event_id, message)
+
+    # Runs on the event loop
+    def _deliver(self, event_id: int, message: dict):
+        with self._lock:
+            queues = list(self._subscribers.get(event_id, ()))
+        for queue in queues:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # The client fell behind; drop its backlog and ask it to
+                # reload the full analytics once
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync", "event_id": event_id})
+
+    async def stream(self, request: Request, event_id: int, queue: asyncio.Queue):
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(), timeout=LIVE_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            self.unsubscribe(event_id, queue)
+
+
+live_hub = LiveHub(LIVE_MAX_CONNECTIONS_PER_EVENT, LIVE_QUEUE_SIZE)
@@ -0,0 +1,35 @@
+from typing import Optional
+from fastapi import HTTPException
+import base64
+import json
+
+# Keyset pagination ordered by id. Cursors are opaque to clients: base64 of
+# the last id served, so a page costs an index seek however deep it is.
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# Applies the cursor and limit to a query and returns
+# {"items": [...], "next_cursor": ...}
+def paginate(query, id_column, cursor: Optional[str], limit: int) -> dict:
+    if cursor:
+        query = query.filter(id_column > decode_cursor(cursor))
+    rows = query.order_by(id_column).limit(limit + 1).all()
+
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.id)
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,252 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+import hashlib
+import logging
+import multiprocessing
+import os
+import qrcode
+
+# Local imports
+from variables import QR_CACHE_MAX_BYTES, QR_DISK_CACHE_DIR, QR_PRERENDER_WORKERS
+from operations.jobs import jobs
+
+# from ..variables import QR_CACHE_MAX_BYTES, QR_DISK_CACHE_DIR, QR_PRERENDER_WORKERS
+# from ..operations.jobs import jobs
+
+
+def render_qr_png(data: str) -> bytes:
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+# Rendering settings, part of every ETag so changing them invalidates
+# browser caches
+QR_RENDER_STYLE = "v1-L-10-4-png"
+
+
+# The image depends only on the token and the style, so the ETag does too
+# and conditional requests are answered without rendering
+def make_etag(token: str) -> str:
+    digest = hashlib.sha256(f"{token}:{QR_RENDER_STYLE}".encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+# Size-bounded LRU of rendered QR images, keyed by qr_token
+class QRCodeCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, token: str) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry
+
+    def put(self, token: str, content: bytes, etag: str):
+        if len(content) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(token, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self._entries[token] = (content, etag)
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def discard(self, token: str):
+        with self._lock:
+            old = self._entries.pop(token, None)
+            if old is not None:
+                self.size -= len(old[0])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+qr_cache = QRCodeCache(QR_CACHE_MAX_BYTES)
+
+
+def qr_disk_path(token: str) -> Optional[str]:
+    if not QR_DISK_CACHE_DIR:
+        return None
+    return os.path.join(QR_DISK_CACHE_DIR, f"{token}.png")
+
+
+# Writes to a temp file first so readers never see a half-written image
+def write_atomic(path: str, content: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+# Returns (png, etag) for a token: memory cache, then disk cache, then render
+def get_qr_code(token: str) -> Tuple[bytes, str]:
+    entry = qr_cache.get(token)
+    if entry is not None:
+        return entry
+
+    path = qr_disk_path(token)
+    content = None
+    if path and os.path.exists(path):
+        with open(path, "rb") as f:
+            content = f.read()
+
+    if content is None:
+        content = render_qr_png(token)
+        if path:
+            # Only a cache, so the write is dropped when the job queue is full
+            jobs.submit("write_qr_code", write_atomic, path, content, required=False)
+
+    etag = make_etag(token)
+    qr_cache.put(token, content, etag)
+    return content, etag
+
+
+def remove_qr_files(token: str, legacy_path: Optional[str] = None):
+    for path in {qr_disk_path(token), legacy_path}:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+# Drops a guest's QR image from memory now and from disk in the background
+def discard_qr_code(token: str, legacy_path: Optional[str] = None):
+    qr_cache.discard(token)
+    # Best effort, a full queue must not fail the guest's deletion
+    jobs.submit(
+        "remove_qr_code", remove_qr_files, token, legacy_path, required=False
+    )
+
+
+# Pre-rendering jobs by event id. Progress is per process, which is enough
+# for the single API worker this app runs with.
+prerender_jobs: Dict[int, dict] = {}
+_prerender_lock = Lock()
+
+# Tokens handed to each worker process per round trip
+PRERENDER_CHUNK_SIZE = 64
+
+
+# Runs in a worker process, so it has to stay a top-level function
+def _prerender_to_disk(args: Tuple[str, str]) -> Optional[str]:
+    token, directory = args
+    try:
+        path = os.path.join(directory, f"{token}.png")
+        if not os.path.exists(path):
+            write_atomic(path, render_qr_png(token))
+        return None
+    except Exception as e:
+        return f"{token}: {str(e)}"
+
+
+def get_prerender_job(event_id: int) -> Optional[dict]:
+    job = prerender_jobs.get(event_id)
+    return dict(job) if job else None
+
+
+# Raises when a pre-rendering job can't be started for the event
+def check_prerender_available(event_id: int):
+    if not QR_DISK_CACHE_DIR:
+        raise HTTPException(
+            status_code=400,
+            detail="QR pre-rendering needs QR_DISK_CACHE_DIR to be set",
+        )
+    job = prerender_jobs.get(event_id)
+    if job and job["status"] in ("queued", "running"):
+        raise HTTPException(
+            status_code=409, detail="QR codes are already being pre-rendered"
+        )
+
+
+# Registers a job for the event, refusing if one is already running
+def start_prerender_job(event_id: int, total: int) -> dict:
+    with _prerender_lock:
+        check_prerender_available(event_id)
+        job = {
+            "event_id": event_id,
+            "status": "queued",
+            "total": total,
+            "rendered": 0,
+            "failed": 0,
+            "errors": [],
+            "started_at": None,
+            "finished_at": None,
+        }
+        prerender_jobs[event_id] = job
+    return dict(job)
+
+
+def finish_prerender_job(event_id: int, status: str, error: Optional[str] = None):
+    job = prerender_jobs[event_id]
+    job["status"] = status
+    if error:
+        job["errors"].append(error)
+    job["finished_at"] = datetime.now().isoformat()
+
+
+# Renders every token to the disk cache across a process pool. Meant to run
+# as a background task, never on the request path.
+def prerender_event_qr_codes(event_id: int, tokens: List[str]):
+    job = prerender_jobs[event_id]
+    job["status"] = "running"
+    job["started_at"] = datetime.now().isoformat()
+    try:
+        os.makedirs(QR_DISK_CACHE_DIR, exist_ok=True)
+        # Spawned, not forked: this runs on a job worker thread, and forking
+        # a threaded process can copy locks other threads hold into children
+        with ProcessPoolExecutor(
+            max_workers=QR_PRERENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            work = ((token, QR_DISK_CACHE_DIR) for token in tokens)
+            for error in pool.map(
+                _prerender_to_disk, work, chunksize=PRERENDER_CHUNK_SIZE
+            ):
+                if error:
+                    job["failed"] += 1
+                    if len(job["errors"]) < 20:
+                        job["errors"].append(error)
+                else:
+                    job["rendered"] += 1
+        job["status"] = "completed"
+    except Exception as e:
+        logging.error(f"QR pre-rendering failed for event {event_id}: {str(e)}")
+        job["status"] = "failed"
+        job["errors"].append(str(e))
+    finally:
+        job["finished_at"] = datetime.now().isoformat()
@@ -0,0 +1,33 @@
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+import re
+
+
+# Turns free text into an FTS5 query matching every word as a prefix
+def match_expression(query: str) -> str:
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+# Searches the user's guests, best matches first. guests_fts is the FTS5
+# index over guest name, email and tags that migration 0006 creates.
+def search_guests(db: Session, user_id: int, query: str, limit: int = 20) -> List:
+    expression = match_expression(query)
+    if not expression:
+        return []
+
+    return db.execute(
+        text(
+            """
+            SELECT g.id, g.name, g.tags, g.email, g.qr_token
+            FROM guests_fts
+            JOIN guests g ON g.id = guests_fts.rowid
+            JOIN events e ON e.id = g.event_id
+            WHERE guests_fts MATCH :expression AND e.created_by = :user_id
+            ORDER BY bm25(guests_fts)
+            LIMIT :limit
+            """
+        ),
+        {"expression": expression, "user_id": user_id, "limit": limit},
+    ).all()
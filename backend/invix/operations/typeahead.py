@@ -0,0 +1,200 @@
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from typing import Dict, List, Set, Tuple
+from sqlalchemy.orm import Session
+import heapq
+import re
+import unicodedata
+
+# Local imports
+from models import Guest
+from variables import TYPEAHEAD_MAX_EVENTS
+
+# from ..models import Guest
+# from ..variables import TYPEAHEAD_MAX_EVENTS
+
+# Guests sharing the most trigrams with the query are re-ranked by edit
+# distance, and kept when at least this similar
+FUZZY_CANDIDATES = 200
+FUZZY_THRESHOLD = 0.6
+
+
+def normalize(value: str) -> str:
+    value = unicodedata.normalize("NFKD", value or "")
+    return "".join(c for c in value if not unicodedata.combining(c)).casefold()
+
+
+def words_of(value: str) -> List[str]:
+    return re.findall(r"\w+", normalize(value))
+
+
+def trigrams(value: str) -> Set[str]:
+    padded = f"  {value} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+# Edit distance counting adjacent transpositions as one edit
+def edit_distance(a: str, b: str) -> int:
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost
+            )
+            if (
+                previous2 is not None
+                and i > 1
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[len(b)]
+
+
+def similarity(query_word: str, word: str) -> float:
+    # Compare against the word's prefix too, the last word may be half typed
+    best = 0.0
+    for candidate in {word, word[: len(query_word)]}:
+        longest = max(len(query_word), len(candidate))
+        best = max(best, 1 - edit_distance(query_word, candidate) / longest)
+    return best
+
+
+# Prefix and trigram index over one event's guest names and emails
+class EventTypeahead:
+    def __init__(self, guests: List[Tuple[int, str, str, str]]):
+        self.guests = guests
+        self.words: List[Tuple[str, int]] = []
+        self.guest_words: List[Set[str]] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+
+        for index, (_, name, email, _) in enumerate(guests):
+            words = set(words_of(name))
+            # Only the local part of the email, domains are shared too widely
+            words.update(words_of(email.split("@")[0]))
+            self.guest_words.append(words)
+            self.words.extend((word, index) for word in words)
+
+            grams = set()
+            for word in words:
+                grams.update(trigrams(word))
+            for gram in grams:
+                self.postings[gram].append(index)
+        self.words.sort()
+
+    def _prefix_candidates(self, prefix: str) -> Set[int]:
+        found = set()
+        position = bisect_left(self.words, (prefix, -1))
+        while position < len(self.words) and self.words[position][0].startswith(
+            prefix
+        ):
+            found.add(self.words[position][1])
+            position += 1
+        return found
+
+    # Returns (score, guest index) pairs, best first
+    def search(self, query: str, limit: int) -> List[Tuple[float, int]]:
+        words = words_of(query)
+        if not words:
+            return []
+
+        scores: Dict[int, float] = {}
+
+        # Every query word has to start some word of the guest
+        candidates = self._prefix_candidates(words[0])
+        for index in candidates:
+            guest_words = self.guest_words[index]
+            if all(
+                any(word.startswith(query_word) for word in guest_words)
+                for query_word in words[1:]
+            ):
+                exact = sum(query_word in guest_words for query_word in words)
+                scores[index] = 2.0 + exact / len(words)
+
+        # Fill up with typo-tolerant matches
+        if len(scores) < limit:
+            shared: Dict[int, int] = defaultdict(int)
+            for query_word in words:
+                for gram in trigrams(query_word):
+                    for index in self.postings.get(gram, ()):
+                        shared[index] += 1
+            candidates = heapq.nlargest(
+                FUZZY_CANDIDATES,
+                (index for index in shared if index not in scores),
+                key=shared.__getitem__,
+            )
+            for index in candidates:
+                guest_words = self.guest_words[index]
+                score = sum(
+                    max(similarity(query_word, word) for word in guest_words)
+                    for query_word in words
+                ) / len(words)
+                if score >= FUZZY_THRESHOLD:
+                    scores[index] = score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(score, index) for index, score in ranked[:limit]]
+
+
+# Lazily built typeahead indexes for the most recently searched events
+class TypeaheadIndex:
+    def __init__(self, max_events: int):
+        self.max_events = max_events
+        self._events: "OrderedDict[int, EventTypeahead]" = OrderedDict()
+        self._versions: Dict[int, int] = defaultdict(int)
+        self._lock = Lock()
+
+    def get(self, db: Session, event_id: int) -> EventTypeahead:
+        with self._lock:
+            index = self._events.get(event_id)
+            if index is not None:
+                self._events.move_to_end(event_id)
+                return index
+            version = self._versions[event_id]
+
+        guests = (
+            db.query(Guest.id, Guest.name, Guest.email, Guest.qr_token)
+            .filter(Guest.event_id == event_id)
+            .all()
+        )
+        index = EventTypeahead(
+            [(id, name or "", email or "", token) for id, name, email, token in guests]
+        )
+        with self._lock:
+            # Don't cache a build that raced with a guest write
+            if self._versions[event_id] != version:
+                return index
+            self._events[event_id] = index
+            while len(self._events) > self.max_events:
+                self._events.popitem(last=False)
+        return index
+
+    def invalidate(self, event_id: int):
+        with self._lock:
+            self._events.pop(event_id, None)
+            self._versions[event_id] += 1
+
+    def suggest(self, db: Session, event_id: int, query: str, limit: int = 10):
+        index = self.get(db, event_id)
+        suggestions = []
+        for score, position in index.search(query, limit):
+            guest_id, name, email, token = index.guests[position]
+            suggestions.append(
+                {
+                    "id": guest_id,
+                    "name": name,
+                    "email": email,
+                    "qr_token": token,
+                    "score": round(score, 3),
+                }
+            )
+        return suggestions
+
+
+typeahead_index = TypeaheadIndex(TYPEAHEAD_MAX_EVENTS)
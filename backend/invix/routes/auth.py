@@ -5,11 +5,11 @@ from google.oauth2 import id_token
 from google.auth.transport import requests
 import os
 import logging
-import asyncio
+import time
 
 
 # Local imports
-from database import SessionLocal
+from database import get_db
 from models import User
 from schemas import PublicUser, UserCreate, UserLogin, GoogleAuthRequest
 from security import (
@@ -20,7 +20,7 @@ from security import (
 from variables import EXPIRY_DATE, GOOGLE_CLIENT_ID
 from operations.functions import fetch_current_user
 
-# from ..database import SessionLocal
+# from ..database import get_db
 # from ..models import User
 # from ..schemas import PublicUser, UserCreate, UserLogin, GoogleAuthRequest
 # from ..security import (
@@ -34,14 +34,6 @@ from operations.functions import fetch_current_user
 router = APIRouter(tags=["Authentication"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/register")
 def register(user: UserCreate, db: Session = Depends(get_db)):
     existing_user = db.query(User).filter(User.email == user.email).first()
@@ -92,7 +84,7 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/google")
-async def google_auth(payload: GoogleAuthRequest, db: Session = Depends(get_db)):
+def google_auth(payload: GoogleAuthRequest, db: Session = Depends(get_db)):
     if not payload.token:
         raise HTTPException(status_code=400, detail="Google token is required")
 
@@ -114,7 +106,7 @@ async def google_auth(payload: GoogleAuthRequest, db: Session = Depends(get_db))
         except ValueError as e:
             if "Token used too early" in str(e):
                 # If token is too early, wait a moment and try again
-                await asyncio.sleep(1)
+                time.sleep(1)
                 idinfo = id_token.verify_oauth2_token(
                     payload.token,
                     requests.Request(),
@@ -176,7 +168,7 @@ async def google_auth(payload: GoogleAuthRequest, db: Session = Depends(get_db))
 
 
 @router.get("/me", response_model=PublicUser)
-def get_current_user(current_user: User = Depends(fetch_current_user)):
+def get_current_user(current_user: PublicUser = Depends(fetch_current_user)):
     user_data = PublicUser.model_validate(
         current_user, from_attributes=True
     )  # Debug log
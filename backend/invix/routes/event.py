@@ -1,27 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, status, Form
-from fastapi.responses import FileResponse
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    File,
+    UploadFile,
+    status,
+    Form,
+    Request,
+    Response,
+    Query,
+)
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
-import pandas as pd
-from io import BytesIO
+from typing import List, Optional, Literal
 import uuid
 import os
 import logging
-import shutil
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 
 # Local imports
-from models import Event, Guest as GuestModel, ActivityLog
+from models import (
+    Event,
+    Guest as GuestModel,
+    ActivityLog,
+    Attendance,
+    EventCounter,
+)
 from schemas import (
     PublicUser,
     EventUpdate,
     EventOut,
+    EventCreated,
     EventResponse,
     Guest,
     EventCreate,
     GuestResponse,
+    ScanBatch,
+    ScanResult,
+    GuestSuggestion,
+    Page,
 )
 from database import get_db
 from operations.functions import (
@@ -30,16 +48,78 @@ from operations.functions import (
     add_guests_to_event,
     fetch_current_user,
 )
+from variables import SCAN_SYNC_MAX_BATCH, PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+from operations.guest_list import (
+    check_guest_list,
+    start_guest_import,
+    get_import_job,
+)
+from operations.checkin import (
+    checkin_index,
+    record_scan,
+    rollback_scan,
+    rollback_scans,
+    UNKNOWN_TOKEN,
+    ALREADY_CHECKED_IN,
+    NOT_CHECKED_IN,
+)
+from operations.live import live_hub
+from operations.analytics import check_in_buckets, activity_log_page
+from operations.counters import event_counts, bump_counters
+from operations.search import search_guests
+from operations.typeahead import typeahead_index
+from operations.pagination import paginate
+from operations.jobs import jobs
+from operations.http_cache import (
+    cache_headers,
+    file_validators,
+    is_fresh,
+    not_modified,
+)
+from operations.images import (
+    check_event_image,
+    save_event_image,
+    resolve_event_image,
+    remove_event_images,
+)
+from operations.export import (
+    EXPORT_MEDIA_TYPES,
+    stream_guests,
+    stream_activity_logs,
+)
+from operations.qrcodes import (
+    get_qr_code,
+    make_etag,
+    discard_qr_code,
+    remove_qr_files,
+    qr_cache,
+    get_prerender_job,
+    check_prerender_available,
+    start_prerender_job,
+    prerender_event_qr_codes,
+    finish_prerender_job,
+)
 
-# from models import Event, Guest as GuestModel, ActivityLog
+# from ..models import (
+#     Event,
+#     Guest as GuestModel,
+#     ActivityLog,
+#     Attendance,
+#     EventCounter,
+# )
 # from ..schemas import (
 #     PublicUser,
 #     EventUpdate,
 #     EventOut,
+#     EventCreated,
 #     EventResponse,
 #     Guest,
 #     EventCreate,
 #     GuestResponse,
+#     ScanBatch,
+#     ScanResult,
+#     GuestSuggestion,
+#     Page,
 # )
 # from ..database import get_db
 # from ..operations.functions import (
@@ -48,6 +128,57 @@ from operations.functions import (
 #     add_guests_to_event,
 #     fetch_current_user,
 # )
+# from ..variables import SCAN_SYNC_MAX_BATCH, PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+# from ..operations.guest_list import (
+#     check_guest_list,
+#     start_guest_import,
+#     get_import_job,
+# )
+# from ..operations.checkin import (
+#     checkin_index,
+#     record_scan,
+#     rollback_scan,
+#     rollback_scans,
+#     UNKNOWN_TOKEN,
+#     ALREADY_CHECKED_IN,
+#     NOT_CHECKED_IN,
+# )
+# from ..operations.live import live_hub
+# from ..operations.analytics import check_in_buckets, activity_log_page
+# from ..operations.counters import event_counts, bump_counters
+# from ..operations.search import search_guests
+# from ..operations.typeahead import typeahead_index
+# from ..operations.pagination import paginate
+# from ..operations.jobs import jobs
+# from ..operations.http_cache import (
+#     cache_headers,
+#     file_validators,
+#     is_fresh,
+#     not_modified,
+# )
+# from ..operations.images import (
+#     check_event_image,
+#     save_event_image,
+#     resolve_event_image,
+#     remove_event_images,
+# )
+# from ..operations.export import (
+#     EXPORT_MEDIA_TYPES,
+#     stream_guests,
+#     stream_activity_logs,
+# )
+# from ..operations.qrcodes import (
+#     get_qr_code,
+#     make_etag,
+#     discard_qr_code,
+#     remove_qr_files,
+#     qr_cache,
+#     get_prerender_job,
+#     check_prerender_available,
+#     start_prerender_job,
+#     prerender_event_qr_codes,
+#     finish_prerender_job,
+# )
 
 router = APIRouter(tags=["Events Management"])
 
@@ -57,28 +188,31 @@ def get_status():
     return {"message": "Your URL is working! Events API is up and running."}
 
 
-# Returns the list of all the events
-@router.get("/all", response_model=List[EventResponse])
-def get_all_events(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    events = fetch_events(db=db, skip=skip, limit=limit)
-    return events
+# Returns a page of all the events
+@router.get("/all", response_model=Page[EventResponse])
+def get_all_events(
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    db: Session = Depends(get_db),
+):
+    return fetch_events(db=db, cursor=cursor, limit=limit)
 
 
-# Returns the list of events belonging to the authenticated user
-@router.get("/events", response_model=List[EventResponse])
+# Returns a page of the events belonging to the authenticated user
+@router.get("/events", response_model=Page[EventResponse])
 def get_user_events(
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
     db: Session = Depends(get_db),
     current_user: PublicUser = Depends(fetch_current_user),
 ):
-    events = db.query(Event).filter(Event.created_by == current_user.id).all()
-    if not events:
-        return []
-    return events
+    query = db.query(Event).filter(Event.created_by == current_user.id)
+    return paginate(query, Event.id, cursor, limit)
 
 
 # Returns a newly-created event
-@router.post("/add", response_model=EventOut)
-async def create_event(
+@router.post("/add", response_model=EventCreated)
+def create_event(
     name: str = Form(...),
     date: str = Form(...),
     time: Optional[str] = Form(None),
@@ -108,21 +242,20 @@ async def create_event(
             detail="Invalid date format. Use YYYY-MM-DD or ISO format.",
         )
 
-    # Handle image upload
+    # Check the guest list before anything is written, so a rejected file
+    # leaves no event behind
+    if guest_list and guest_list.filename:
+        check_guest_list(guest_list)
+
+    # Handle image upload. The file and its resized variants are written
+    # once the event is committed.
     image_url = "default_event.jpg"
+    image_content = None
     if image and image.filename:
-        try:
-            upload_dir = "static/events"
-            os.makedirs(upload_dir, exist_ok=True)
-            ext = os.path.splitext(image.filename)[1]
-            unique_name = f"{uuid.uuid4()}{ext}"
-            path = os.path.join(upload_dir, unique_name)
-            with open(path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-            image_url = unique_name
-        except Exception as e:
-            logging.error(f"Image save failed: {str(e)}")
-            raise HTTPException(status_code=500, detail="Failed to save image")
+        ext = os.path.splitext(image.filename)[1]
+        image_url = f"{uuid.uuid4()}{ext}"
+        image_content = image.file.read()
+        check_event_image(image_content)
 
     # Create the event object
     event_data = EventCreate(
@@ -154,66 +287,42 @@ async def create_event(
             ),
         )
         db.add(activity_log)
-
-        # Handle guest list file after event creation
-        if guest_list and guest_list.filename:
-            try:
-                contents = await guest_list.read()
-                filename = guest_list.filename.lower()
-                if filename.endswith(".csv"):
-                    df = pd.read_csv(BytesIO(contents))
-                elif filename.endswith((".xlsx", ".xls")):
-                    df = pd.read_excel(BytesIO(contents))
-                else:
-                    raise HTTPException(
-                        status_code=400, detail="Unsupported guest list file type"
-                    )
-
-                guest_count = 0
-                for _, row in df.iterrows():
-                    name = row.get("name")
-                    email = row.get("email", "")
-                    tags = row.get("tags", "")
-                    guest_data = Guest(name=name, tags=tags, email=email)
-                    add_guests_to_event(
-                        db=db,
-                        event_id=new_event.id,
-                        guest=guest_data,
-                        uuid=str(uuid.uuid4()),
-                    )
-                    guest_count += 1
-
-                # Create activity log for bulk guest addition
-                if guest_count > 0:
-                    bulk_activity_log = ActivityLog(
-                        event_id=new_event.id,
-                        user_id=current_user.id,
-                        type="guest_list_updated",
-                        description=f"Added {guest_count} guests via file upload",
-                        status="completed",
-                        method="bulk_import",
-                        activity_data=json.dumps(
-                            {
-                                "file_type": filename.split(".")[-1],
-                                "guests_added": guest_count,
-                            }
-                        ),
-                    )
-                    db.add(bulk_activity_log)
-
-            except Exception as e:
-                logging.error(f"Error parsing guest list file: {str(e)}")
-                raise HTTPException(
-                    status_code=500, detail="Failed to process guest list file"
-                )
-
         db.commit()
-        return new_event
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         logging.error(f"Event creation failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Event creation failed")
 
+    # Written by a background job, or here when the queue is full
+    if image_content is not None and not jobs.submit(
+        "save_event_image",
+        save_event_image,
+        image_url,
+        image_content,
+        required=False,
+    ):
+        save_event_image(image_url, image_content)
+
+    created = EventCreated.model_validate(new_event)
+    # The guest list is imported by a background job, poll its status. The
+    # event exists either way, so a job that can't be queued is reported
+    # rather than raised.
+    if guest_list and guest_list.filename:
+        try:
+            import_job = start_guest_import(
+                new_event.id, guest_list, user_id=current_user.id
+            )
+            created.guest_import_id = import_job["id"]
+        except HTTPException as e:
+            logging.warning(
+                f"Guest list import not queued for event {new_event.id}: {e.detail}"
+            )
+            created.guest_import_error = e.detail
+    return created
+
 
 # Returns the event with the given ID and If the event is not found, it raises a 404 error
 @router.get("/get-event/{event_id}", response_model=EventResponse)
@@ -234,29 +343,48 @@ def get_event(
     return event
 
 
+# Serves the event image resized to size (thumb, card, full) as WebP when
+# the browser accepts it, or the upload itself with size=original
 @router.get("/event-image/{event_id}")
-def get_event_image(event_id: int, db: Session = Depends(get_db)):
-    event = db.query(Event).filter(Event.id == event_id).first()
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-
-    if not event.image_url:
+def get_event_image(
+    event_id: int,
+    request: Request,
+    size: Literal["thumb", "card", "full", "original"] = "full",
+    db: Session = Depends(get_db),
+):
+    image_url = db.query(Event.image_url).filter(Event.id == event_id).scalar()
+    if image_url is None:
+        event_exists = db.query(Event.id).filter(Event.id == event_id).first()
+        if not event_exists:
+            raise HTTPException(status_code=404, detail="Event not found")
         raise HTTPException(status_code=404, detail="No image available for this event")
 
-    image_path = os.path.join("static/events", event.image_url)
-    if not os.path.exists(image_path):
+    accepts_webp = "image/webp" in request.headers.get("accept", "")
+    image = resolve_event_image(image_url, size, accepts_webp)
+    if image is None:
         raise HTTPException(status_code=404, detail="Image file not found")
 
-    return FileResponse(path=image_path, media_type="image/jpeg")
+    path, media_type, pending = image
+    etag, last_modified = file_validators(path)
+    headers = cache_headers(
+        "event_image_pending" if pending else "event_image",
+        etag,
+        last_modified,
+        Vary="Accept",
+    )
+    if is_fresh(request, etag, last_modified):
+        return not_modified(headers)
+    return FileResponse(path=path, media_type=media_type, headers=headers)
 
 
-# Route to get all guests
-@router.get("/guests/all", response_model=List[GuestResponse])
-def get_all_guests(db: Session = Depends(get_db)):
-    guests = db.query(GuestModel).all()
-    if not guests:
-        return []
-    return guests
+# Route to get a page of all guests
+@router.get("/guests/all", response_model=Page[GuestResponse])
+def get_all_guests(
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    db: Session = Depends(get_db),
+):
+    return paginate(db.query(GuestModel), GuestModel.id, cursor, limit)
 
 
 # Adds guests to an event and returns the newly added guest
@@ -290,48 +418,95 @@ def add_guest(
     )
     db.add(activity_log)
     db.commit()
+    live_hub.publish(
+        event_id, "guest_added", {"guest_id": new_guest.id, "guest_name": guest.name}
+    )
 
     return new_guest
 
 
-# Route to get guests by event ID
-@router.get("/guests/{event_id}", response_model=List[GuestResponse])
-def get_guests_by_event(event_id: int, db: Session = Depends(get_db)):
-    guests = db.query(GuestModel).filter(GuestModel.event_id == event_id).all()
-    return guests
+# Route to get a page of guests by event ID
+@router.get("/guests/{event_id}", response_model=Page[GuestResponse])
+def get_guests_by_event(
+    event_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    db: Session = Depends(get_db),
+):
+    query = db.query(GuestModel).filter(GuestModel.event_id == event_id)
+    return paginate(query, GuestModel.id, cursor, limit)
+
+
+def get_owned_event_id(db: Session, event_id: int, user_id: int) -> int:
+    event_exists = (
+        db.query(Event.id)
+        .filter(Event.id == event_id, Event.created_by == user_id)
+        .first()
+    )
+    if not event_exists:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return event_id
+
+
+# The same check as a dependency. Being sync, FastAPI runs it in the
+# threadpool, so async routes don't query the database on the event loop.
+def owned_event_id(
+    event_id: int,
+    db: Session = Depends(get_db),
+    current_user: PublicUser = Depends(fetch_current_user),
+) -> int:
+    return get_owned_event_id(db, event_id, current_user.id)
+
+
+def export_response(rows, export_format: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"'
+        },
+    )
 
 
-# Route to add guests in bulk
-@router.post("/guests-bulk/{event_id}", response_model=List[Guest])
-async def add_bulk_guests(
-    event_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)
+# Streams the event's full guest list as NDJSON or CSV
+@router.get("/guests/{event_id}/export")
+def export_guests(
+    event_id: int,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: Session = Depends(get_db),
+    current_user: PublicUser = Depends(fetch_current_user),
 ):
-    try:
-        contents = await file.read()
-        filename = file.filename.lower()
-
-        if filename.endswith(".csv"):
-            df = pd.read_csv(BytesIO(contents))
-        elif filename.endswith(".xlsx") or filename.endswith(".xls"):
-            df = pd.read_excel(BytesIO(contents))
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type")
-
-        processed: List[Guest] = []
-        for _, row in df.iterrows():
-            name = row.get("name")
-            tags = row.get("tags", "")
-            email = row.get("email", "")
-            guest_data = Guest(name=name, tags=tags, email=email)
-            add_guests_to_event(
-                db=db, event_id=event_id, guest=guest_data, uuid=str(uuid.uuid4())
-            )
+    get_owned_event_id(db, event_id, current_user.id)
+    return export_response(
+        stream_guests(event_id, format), format, f"event-{event_id}-guests"
+    )
 
-        return processed
 
-    except Exception as e:
-        print(e)
-        raise HTTPException(status_code=500, detail=str(e))
+# Route to add guests in bulk. Queues the import and returns its status;
+# poll /imports/{import_id} for progress. With mode=upsert, a re-uploaded
+# list updates the guests it already added instead of duplicating them.
+@router.post("/guests-bulk/{event_id}", status_code=202)
+def add_bulk_guests(
+    file: UploadFile = File(...),
+    mode: Literal["append", "upsert"] = "append",
+    event_id: int = Depends(owned_event_id),
+    current_user: PublicUser = Depends(fetch_current_user),
+):
+    return start_guest_import(event_id, file, user_id=current_user.id, mode=mode)
+
+
+# Progress of a guest list import: rows processed, inserted and failed,
+# the failed rows with their reason, and rows per second. Only the user who
+# started it can see it.
+@router.get("/imports/{import_id}")
+def get_guest_import(
+    import_id: str,
+    current_user: PublicUser = Depends(fetch_current_user),
+):
+    job = get_import_job(import_id)
+    if not job or job["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return job
 
 
 # Update an event by ID
@@ -353,7 +528,16 @@ def update_event(event_id: int, updated: EventUpdate, db: Session = Depends(get_
     return event
 
 
-# Delete an event by ID
+# Removes a deleted event's files, runs as one background job
+def remove_event_files(image_url: Optional[str], qr_files: List[tuple]):
+    if image_url and image_url != "default_event.jpg":
+        remove_event_images(image_url)
+    for token, legacy_path in qr_files:
+        remove_qr_files(token, legacy_path)
+
+
+# Delete an event by ID. Rows go with one DELETE per table in a single short
+# transaction; image and QR files are removed by a background job.
 @router.delete("/delete/{event_id}")
 def delete_event(
     event_id: int,
@@ -366,7 +550,25 @@ def delete_event(
         if not event:
             raise HTTPException(status_code=404, detail="Event not found")
 
-        # Create activity log for event deletion
+        image_url = event.image_url
+        qr_files = (
+            db.query(GuestModel.qr_token, GuestModel.qr_path)
+            .filter(GuestModel.event_id == event_id)
+            .all()
+        )
+
+        for model, column in (
+            (ActivityLog, ActivityLog.event_id),
+            (Attendance, Attendance.event_id),
+            (EventCounter, EventCounter.event_id),
+            (GuestModel, GuestModel.event_id),
+            (Event, Event.id),
+        ):
+            db.query(model).filter(column == event_id).delete(
+                synchronize_session=False
+            )
+
+        # Create activity log for event deletion, after the event's logs are gone
         activity_log = ActivityLog(
             event_id=event_id,
             user_id=current_user.id,
@@ -383,54 +585,53 @@ def delete_event(
             ),
         )
         db.add(activity_log)
-
-        # Delete event image if it exists
-        if event.image_url and event.image_url != "default_event.jpg":
-            image_path = os.path.join("static/events", event.image_url)
-            if os.path.exists(image_path):
-                try:
-                    os.remove(image_path)
-                except Exception as e:
-                    logging.error(f"Error deleting event image: {str(e)}")
-
-        # Get all guests associated with this event
-        guests = db.query(GuestModel).filter(GuestModel.event_id == event_id).all()
-
-        # Delete QR code files for all guests
-        for guest in guests:
-            if guest.qr_path and os.path.exists(guest.qr_path):
-                try:
-                    os.remove(guest.qr_path)
-                except Exception as e:
-                    logging.error(
-                        f"Error deleting QR code file for guest {guest.id}: {str(e)}"
-                    )
-
-        # Delete activity logs
-        activity_logs = (
-            db.query(ActivityLog).filter(ActivityLog.event_id == event_id).all()
-        )
-        for log in activity_logs:
-            db.delete(log)
-
-        # Delete guests
-        for guest in guests:
-            db.delete(guest)
-
-        # Finally delete the event
-        db.delete(event)
         db.commit()
+        checkin_index.drop_event(event_id)
+        typeahead_index.invalidate(event_id)
+        for token, _ in qr_files:
+            qr_cache.discard(token)
+        # The rows are gone already, a refused job only leaves stray files
+        if not jobs.submit(
+            "remove_event_files",
+            remove_event_files,
+            image_url,
+            qr_files,
+            required=False,
+        ):
+            logging.warning(f"Files of deleted event {event_id} were not removed")
 
         return {"message": "Event and all associated data deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         logging.error(f"Error deleting event: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to delete event: {str(e)}")
 
 
+# Queues a background job rendering every guest's QR code for the event
+def schedule_qr_prerender(db: Session, event_id: int) -> dict:
+    tokens = [
+        token
+        for (token,) in db.query(GuestModel.qr_token).filter(
+            GuestModel.event_id == event_id
+        )
+    ]
+    job = start_prerender_job(event_id, len(tokens))
+    try:
+        jobs.submit(
+            "prerender_qr_codes", prerender_event_qr_codes, event_id, tokens
+        )
+    except HTTPException:
+        finish_prerender_job(event_id, "failed", "Background queue is full")
+        raise
+    return job
+
+
 @router.put("/activate/{event_id}", response_model=EventOut)
 def activate_event(
     event_id: int,
+    prerender_qr: bool = False,
     db: Session = Depends(get_db),
     current_user: PublicUser = Depends(fetch_current_user),
 ):
@@ -447,14 +648,70 @@ def activate_event(
     if event.status == "active":
         raise HTTPException(status_code=400, detail="Event is already active")
 
+    # Refuse before activating rather than fail after the commit
+    if prerender_qr:
+        check_prerender_available(event.id)
+
     # Update event status to active
     event.status = "active"
     db.commit()
     db.refresh(event)
 
+    # Warm the door-scan index so check-ins need no read queries
+    checkin_index.warm(db, event.id)
+
+    # The event is active either way, a job that can't be queued now is
+    # reported as failed by the progress endpoint
+    if prerender_qr:
+        try:
+            schedule_qr_prerender(db, event.id)
+        except HTTPException as e:
+            logging.warning(
+                f"QR pre-rendering not started for event {event.id}: {e.detail}"
+            )
+
     return event
 
 
+# Starts pre-rendering QR codes for every guest of the event
+@router.post("/{event_id}/qrcodes/prerender", status_code=202)
+def prerender_qrcodes(
+    event_id: int,
+    db: Session = Depends(get_db),
+    current_user: PublicUser = Depends(fetch_current_user),
+):
+    event = (
+        db.query(Event)
+        .filter(Event.id == event_id, Event.created_by == current_user.id)
+        .first()
+    )
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    return schedule_qr_prerender(db, event.id)
+
+
+# Returns the progress of the event's QR pre-rendering job
+@router.get("/{event_id}/qrcodes/prerender")
+def get_prerender_progress(
+    event_id: int,
+    db: Session = Depends(get_db),
+    current_user: PublicUser = Depends(fetch_current_user),
+):
+    event = (
+        db.query(Event.id)
+        .filter(Event.id == event_id, Event.created_by == current_user.id)
+        .first()
+    )
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    job = get_prerender_job(event_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No pre-rendering job found")
+    return job
+
+
 # Delete a guest by ID
 @router.delete("/delete-guest/{guest_id}")
 def delete_guest(
@@ -481,30 +738,47 @@ def delete_guest(
     )
     db.add(activity_log)
 
-    # Delete the QR code file if it exists
-    if guest.qr_path and os.path.exists(guest.qr_path):
-        try:
-            os.remove(guest.qr_path)
-        except Exception as e:
-            logging.error(f"Error deleting QR code file: {str(e)}")
+    # Delete the cached QR code if it exists
+    discard_qr_code(guest.qr_token, guest.qr_path)
 
+    qr_token = guest.qr_token
+    event_id = guest.event_id
+    attendance = guest.attendance
+    attendance_status = attendance.status if attendance else "pending"
+    # Through the session, so the attendance row goes before the guest
+    if attendance:
+        db.delete(attendance)
     db.delete(guest)
+    # Flushed first, so a missing counter row is recounted without the guest
+    db.flush()
+    bump_counters(
+        db,
+        event_id,
+        total_guests=-1,
+        checked_in=-1 if attendance_status == "checked_in" else 0,
+        checked_out=-1 if attendance_status == "checked_out" else 0,
+    )
     db.commit()
+    checkin_index.discard(qr_token)
+    typeahead_index.invalidate(event_id)
+    live_hub.publish(event_id, "guest_deleted", {"guest_id": guest_id})
     return {"message": "Guest deleted"}
 
 
+# Renders the QR code on first request and serves it from cache afterwards
 @router.get("/qrcode/{uuid}")
-def view_qrcode(uuid: str, db: Session = Depends(get_db)):
-    guest = db.query(GuestModel).filter(GuestModel.qr_token == uuid).first()
-    if not guest:
+def view_qrcode(uuid: str, request: Request, db: Session = Depends(get_db)):
+    guest_id = db.query(GuestModel.id).filter(GuestModel.qr_token == uuid).scalar()
+    if guest_id is None:
         raise HTTPException(status_code=404, detail="Guest not found")
 
-    file_path = guest.qr_path
+    etag = make_etag(uuid)
+    headers = cache_headers("qrcode", etag)
+    if is_fresh(request, etag):
+        return not_modified(headers)
 
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="QR code file not found")
-
-    return FileResponse(path=guest.qr_path, media_type="image/png")
+    content, _ = get_qr_code(uuid)
+    return Response(content=content, media_type="image/png", headers=headers)
 
 
 @router.get("/readqrcode/{uuid}")
@@ -518,19 +792,16 @@ def read_qrcode(uuid: str, db: Session = Depends(get_db)):
         # Get the event details
         event = db.query(Event).filter(Event.id == guest.event_id).first()
 
-        # Get check-in status from activity log
-        activity_log = (
-            db.query(ActivityLog)
-            .filter(
-                ActivityLog.guest_id == guest.id, ActivityLog.event_id == guest.event_id
+        # Get check-in status from the guest's attendance state
+        attendance = guest.attendance
+        status = attendance.status if attendance else "pending"
+        last_activity = None
+        if attendance:
+            last_activity = (
+                attendance.check_out_at
+                if status == "checked_out"
+                else attendance.check_in_at
             )
-            .order_by(ActivityLog.check_in_time.desc())
-            .first()
-        )
-
-        status = "pending"
-        if activity_log:
-            status = activity_log.status
 
         return {
             "name": guest.name,
@@ -543,16 +814,20 @@ def read_qrcode(uuid: str, db: Session = Depends(get_db)):
                 "location": event.location,
             },
             "status": status,
-            "lastActivity": activity_log.check_in_time if activity_log else None,
+            "lastActivity": last_activity,
             "qr_token": guest.qr_token,
         }
     except Exception as e:
         raise HTTPException(status_code=404, detail="Guest not found")
 
 
+# Returns attendance counts, check-ins per time bucket across the event
+# window and the first page of the activity log
 @router.get("/{event_id}/analytics")
 def get_event_analytics(
     event_id: int,
+    bucket_minutes: int = Query(60, ge=5, le=24 * 60),
+    logs_limit: int = Query(50, ge=1, le=500),
     db: Session = Depends(get_db),
     current_user: PublicUser = Depends(fetch_current_user),
 ):
@@ -566,91 +841,92 @@ def get_event_analytics(
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    # Get guest status counts
-    checked_in = (
-        db.query(func.count(ActivityLog.id))
-        .filter(ActivityLog.event_id == event_id, ActivityLog.status == "checked_in")
-        .scalar()
-        or 0
+    logs = activity_log_page(db, event_id, limit=logs_limit)
+    return {
+        **event_counts(db, event),
+        "checkInTimes": check_in_buckets(db, event, bucket_minutes),
+        "activityLogs": logs["logs"],
+        "activityLogsNextBeforeId": logs["nextBeforeId"],
+    }
+
+
+# Returns the event's attendance counters, a single primary-key read
+@router.get("/{event_id}/summary")
+def get_event_summary(
+    event_id: int,
+    db: Session = Depends(get_db),
+    current_user: PublicUser = Depends(fetch_current_user),
+):
+    event = (
+        db.query(Event)
+        .filter(Event.id == event_id, Event.created_by == current_user.id)
+        .first()
     )
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    return event_counts(db, event)
 
-    checked_out = (
-        db.query(func.count(ActivityLog.id))
-        .filter(ActivityLog.event_id == event_id, ActivityLog.status == "checked_out")
-        .scalar()
-        or 0
+
+# Streams the event's full activity log as NDJSON or CSV, oldest first
+@router.get("/{event_id}/activity-logs/export")
+def export_activity_logs(
+    event_id: int,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: Session = Depends(get_db),
+    current_user: PublicUser = Depends(fetch_current_user),
+):
+    get_owned_event_id(db, event_id, current_user.id)
+    return export_response(
+        stream_activity_logs(event_id, format), format, f"event-{event_id}-activity"
     )
 
-    # Calculate pending guests (total guests minus checked in and checked out)
-    total_guests = (
-        db.query(func.count(GuestModel.id))
-        .filter(GuestModel.event_id == event_id)
-        .scalar()
-        or 0
+
+# Returns the event's activity log newest first, a page at a time
+@router.get("/{event_id}/activity-logs")
+def get_activity_logs(
+    event_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    before_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: PublicUser = Depends(fetch_current_user),
+):
+    event_exists = (
+        db.query(Event.id)
+        .filter(Event.id == event_id, Event.created_by == current_user.id)
+        .first()
     )
-    pending = total_guests - checked_in - checked_out
+    if not event_exists:
+        raise HTTPException(status_code=404, detail="Event not found")
 
-    # Get check-in times by hour
-    check_in_times = []
-    for hour in range(9, 17):  # 9 AM to 4 PM
-        hour_start = datetime.now().replace(
-            hour=hour, minute=0, second=0, microsecond=0
-        )
-        hour_end = hour_start + timedelta(hours=1)
-
-        count = (
-            db.query(func.count(ActivityLog.id))
-            .filter(
-                ActivityLog.event_id == event_id,
-                ActivityLog.status == "checked_in",
-                ActivityLog.check_in_time >= hour_start,
-                ActivityLog.check_in_time < hour_end,
-            )
-            .scalar()
-            or 0
-        )
+    return activity_log_page(db, event_id, limit=limit, before_id=before_id)
 
-        check_in_times.append(
-            {"hour": f"{hour} AM" if hour < 12 else f"{hour - 12} PM", "count": count}
-        )
 
-    # Get activity logs for the event
-    activity_logs = (
-        db.query(ActivityLog)
-        .filter(ActivityLog.event_id == event_id)
-        .order_by(ActivityLog.check_in_time.desc())
-        .all()
+# Pushes check-ins, check-outs and guest list changes to dashboards as
+# Server-Sent Events, so they don't have to poll the analytics route
+@router.get("/{event_id}/live")
+async def live_attendance(
+    request: Request,
+    event_id: int = Depends(owned_event_id),
+):
+    queue = live_hub.subscribe(event_id)
+    return StreamingResponse(
+        live_hub.stream(request, event_id, queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    # Format activity logs for response
-    formatted_logs = []
-    for log in activity_logs:
-        formatted_log = {
-            "guest_name": log.name,
-            "status": log.status,
-            "check_in_time": (
-                log.check_in_time.isoformat() if log.check_in_time else None
-            ),
-            "check_out_time": (
-                log.check_out_time.isoformat() if log.check_out_time else None
-            ),
-            "method": log.method,
-            "timestamp": (
-                log.check_in_time.isoformat()
-                if log.check_in_time
-                else log.check_out_time.isoformat() if log.check_out_time else None
-            ),
-        }
-        formatted_logs.append(formatted_log)
 
-    return {
-        "checkedIn": checked_in,
-        "checkedOut": checked_out,
-        "pending": pending,
-        "totalGuests": total_guests,
-        "checkInTimes": check_in_times,
-        "activityLogs": formatted_logs,
-    }
+def publish_scan(guest, action: str):
+    live_hub.publish(
+        guest.event_id,
+        action,
+        {
+            "guest_id": guest.guest_id,
+            "guest_name": guest.name,
+            "status": "checked_in" if action == "check_in" else "checked_out",
+        },
+    )
 
 
 @router.post("/check-in/{uuid}")
@@ -659,8 +935,8 @@ def check_in_guest(
     db: Session = Depends(get_db),
     current_user: PublicUser = Depends(fetch_current_user),
 ):
-    guest = db.query(GuestModel).filter(GuestModel.qr_token == uuid).first()
-    if not guest:
+    outcome, guest, previous = record_scan(db, uuid, "check_in", current_user.id)
+    if outcome == UNKNOWN_TOKEN:
         raise HTTPException(
             status_code=404,
             detail={
@@ -670,19 +946,7 @@ def check_in_guest(
             },
         )
 
-    # Check if guest is already checked in
-    latest_activity = (
-        db.query(ActivityLog)
-        .filter(
-            ActivityLog.guest_id == guest.id,
-            ActivityLog.event_id == guest.event_id,
-            ActivityLog.type == "check_in",
-        )
-        .order_by(ActivityLog.created_at.desc())
-        .first()
-    )
-
-    if latest_activity and latest_activity.status == "completed":
+    if outcome == ALREADY_CHECKED_IN:
         raise HTTPException(
             status_code=400,
             detail={
@@ -690,38 +954,23 @@ def check_in_guest(
                 "message": f"{guest.name} is already checked in",
                 "guest_name": guest.name,
                 "last_check_in": (
-                    latest_activity.activity_data.get("check_in_time")
-                    if latest_activity.activity_data
-                    else None
+                    guest.check_in_at.isoformat() if guest.check_in_at else None
                 ),
             },
         )
 
-    # Create activity log entry
-    check_in_time = datetime.now()
-    activity_log = ActivityLog(
-        guest_id=guest.id,
-        event_id=guest.event_id,
-        user_id=current_user.id,
-        type="check_in",
-        description=f"Guest {guest.name} checked in via QR code",
-        status="completed",
-        method="qr_code",
-        activity_data=json.dumps(
-            {
-                "check_in_time": check_in_time.isoformat(),
-                "location": "main entrance",  # You can make this dynamic if needed
-            }
-        ),
-    )
-    db.add(activity_log)
-    db.commit()
+    try:
+        db.commit()
+    except Exception:
+        rollback_scan(db, guest, previous)
+        raise
+    publish_scan(guest, "check_in")
 
     return {
         "message": f"Guest {guest.name} checked in successfully",
         "status": "success",
         "guest_name": guest.name,
-        "check_in_time": check_in_time.isoformat(),
+        "check_in_time": guest.check_in_at.isoformat(),
     }
 
 
@@ -731,24 +980,14 @@ def check_out_guest(
     db: Session = Depends(get_db),
     current_user: PublicUser = Depends(fetch_current_user),
 ):
-    guest = db.query(GuestModel).filter(GuestModel.qr_token == uuid).first()
-    if not guest:
-        raise HTTPException(status_code=404, detail="Guest not found")
-
-    # Get the latest check-in activity
-    latest_activity = (
-        db.query(ActivityLog)
-        .filter(
-            ActivityLog.guest_id == guest.id,
-            ActivityLog.event_id == guest.event_id,
-            ActivityLog.type == "check_in",
-            ActivityLog.status == "completed",
-        )
-        .order_by(ActivityLog.created_at.desc())
-        .first()
+    check_out_time = datetime.now()
+    outcome, guest, previous = record_scan(
+        db, uuid, "check_out", current_user.id, at=check_out_time
     )
+    if outcome == UNKNOWN_TOKEN:
+        raise HTTPException(status_code=404, detail="Guest not found")
 
-    if not latest_activity:
+    if outcome == NOT_CHECKED_IN:
         raise HTTPException(
             status_code=400,
             detail={
@@ -758,32 +997,12 @@ def check_out_guest(
             },
         )
 
-    # Create activity log entry
-    check_out_time = datetime.now()
-    activity_log = ActivityLog(
-        guest_id=guest.id,
-        event_id=guest.event_id,
-        user_id=current_user.id,
-        type="check_out",
-        description=f"Guest {guest.name} checked out via QR code",
-        status="completed",
-        method="qr_code",
-        activity_data=json.dumps(
-            {
-                "check_out_time": check_out_time.isoformat(),
-                "check_in_time": latest_activity.activity_data.get("check_in_time"),
-                "duration": (
-                    check_out_time
-                    - datetime.fromisoformat(
-                        latest_activity.activity_data.get("check_in_time")
-                    )
-                ).total_seconds()
-                / 3600,  # Duration in hours
-            }
-        ),
-    )
-    db.add(activity_log)
-    db.commit()
+    try:
+        db.commit()
+    except Exception:
+        rollback_scan(db, guest, previous)
+        raise
+    publish_scan(guest, "check_out")
 
     return {
         "message": f"Guest {guest.name} checked out successfully",
@@ -791,22 +1010,95 @@ def check_out_guest(
     }
 
 
+# Replays scans queued by an offline scanner in one transaction, oldest first
+@router.post("/scans/sync", response_model=List[ScanResult])
+def sync_scans(
+    batch: ScanBatch,
+    db: Session = Depends(get_db),
+    current_user: PublicUser = Depends(fetch_current_user),
+):
+    if len(batch.scans) > SCAN_SYNC_MAX_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A sync batch can hold at most {SCAN_SYNC_MAX_BATCH} scans",
+        )
+
+    # Scan times are stored as naive local time like the rest of the app
+    scans = [
+        (
+            scan.scanned_at.astimezone().replace(tzinfo=None)
+            if scan.scanned_at.tzinfo
+            else scan.scanned_at,
+            scan,
+        )
+        for scan in batch.scans
+    ]
+
+    results = []
+    successes = []
+    applied = []
+    try:
+        for scanned_at, scan in sorted(scans, key=lambda item: item[0]):
+            outcome, guest, previous = record_scan(
+                db,
+                scan.qr_token,
+                scan.action,
+                current_user.id,
+                at=scanned_at,
+                method="offline_sync",
+            )
+            result = ScanResult(
+                scan_id=scan.scan_id,
+                qr_token=scan.qr_token,
+                action=scan.action,
+                scanned_at=scan.scanned_at,
+                result=outcome,
+                guest_name=guest.name if guest else None,
+            )
+            results.append(result)
+            if previous is not None:
+                applied.append((guest, previous))
+                successes.append(result)
+
+        db.commit()
+    except Exception as e:
+        rollback_scans(db, applied)
+        logging.error(f"Scan sync failed: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to sync scans")
+
+    for result, (guest, _) in zip(successes, applied):
+        publish_scan(guest, result.action)
+
+    return results
+
+
+# Full-text search over the user's guests by name, email or tags, matching
+# each word as a prefix
 @router.get("/search-guest", response_model=List[GuestResponse])
 def search_guest(
     query: str,
+    limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: PublicUser = Depends(fetch_current_user),
 ):
-    # Search for guests where name, email, or tags contain the query string
-    guests = (
-        db.query(GuestModel)
-        .join(Event)
-        .filter(Event.created_by == current_user.id)
-        .filter(
-            (GuestModel.name.ilike(f"%{query}%"))
-            | (GuestModel.email.ilike(f"%{query}%"))
-            | (GuestModel.tags.ilike(f"%{query}%"))
-        )
-        .all()
+    return search_guests(db, current_user.id, query, limit)
+
+
+# Door-side lookup by name or email while typing, tolerant of typos
+@router.get("/{event_id}/guests/autocomplete", response_model=List[GuestSuggestion])
+def autocomplete_guests(
+    event_id: int,
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: PublicUser = Depends(fetch_current_user),
+):
+    event_exists = (
+        db.query(Event.id)
+        .filter(Event.id == event_id, Event.created_by == current_user.id)
+        .first()
     )
-    return guests
+    if not event_exists:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    return typeahead_index.suggest(db, event_id, q, limit)
@@ -1,7 +1,9 @@
 # File for FastAPI operations and database connection management.
 from datetime import date, datetime
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Literal, Generic, TypeVar
+
+T = TypeVar("T")
 
 
 # For Authentication and User Management
@@ -50,6 +52,12 @@ class PublicUser(BaseModel):
         from_attributes = True
 
 
+# A page of a list endpoint, pass next_cursor back to get the following one
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
 # For Event Management
 class Guest(BaseModel):
     name: str
@@ -71,6 +79,14 @@ class GuestResponse(BaseModel):
         from_attributes = True
 
 
+class GuestSuggestion(BaseModel):
+    id: int
+    name: str
+    email: str
+    qr_token: str
+    score: float
+
+
 class EventBase(BaseModel):
     name: str
     date: date
@@ -110,3 +126,32 @@ class EventOut(EventCreate):
 
     class Config:
         from_attributes = True
+
+
+# Returned by event creation, with the id of the guest list import if a
+# file was uploaded
+class EventCreated(EventOut):
+    guest_import_id: Optional[str] = None
+    # Set when the event was created but its guest list couldn't be queued
+    guest_import_error: Optional[str] = None
+
+
+# For door scanners syncing scans queued while offline
+class ScanEvent(BaseModel):
+    qr_token: str
+    action: Literal["check_in", "check_out"]
+    scanned_at: datetime
+    scan_id: Optional[str] = None  # Client-side id, echoed back in the result
+
+
+class ScanBatch(BaseModel):
+    scans: List[ScanEvent]
+
+
+class ScanResult(BaseModel):
+    scan_id: Optional[str] = None
+    qr_token: str
+    action: str
+    scanned_at: datetime
+    result: str
+    guest_name: Optional[str] = None
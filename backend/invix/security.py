@@ -6,11 +6,11 @@ import bcrypt
 from sqlalchemy.orm import Session
 
 # Local imports
-from database import SessionLocal
+from database import get_db
 from models import User
 from variables import ALGORITHM, SECRET_KEY, EXPIRY_DATE
 
-# from .database import SessionLocal
+# from .database import get_db
 # from .models import User
 # from .variables import ALGORITHM, SECRET_KEY, EXPIRY_DATE
 
@@ -33,14 +33,6 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 def verify_token(token: str, db: Session = Depends(get_db)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
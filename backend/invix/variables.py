@@ -6,3 +6,46 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 ALGORITHM = settings.ALGORITHM
 SECRET_KEY = settings.SECRET_KEY
 GOOGLE_CLIENT_ID = settings.GOOGLE_CLIENT_ID
+
+DATABASE_URL = settings.DATABASE_URL
+SQLITE_JOURNAL_MODE = settings.SQLITE_JOURNAL_MODE
+SQLITE_SYNCHRONOUS = settings.SQLITE_SYNCHRONOUS
+SQLITE_MMAP_SIZE = settings.SQLITE_MMAP_SIZE
+SQLITE_CACHE_SIZE_KB = settings.SQLITE_CACHE_SIZE_KB
+SQLITE_BUSY_TIMEOUT_MS = settings.SQLITE_BUSY_TIMEOUT_MS
+SQLITE_WRITE_LANE = settings.SQLITE_WRITE_LANE
+DB_POOL_SIZE = settings.DB_POOL_SIZE
+DB_MAX_OVERFLOW = settings.DB_MAX_OVERFLOW
+DB_POOL_TIMEOUT = settings.DB_POOL_TIMEOUT
+
+THREADPOOL_SIZE = settings.THREADPOOL_SIZE
+
+GUEST_LIST_MAX_BYTES = settings.GUEST_LIST_MAX_BYTES
+GUEST_LIST_MAX_ROWS = settings.GUEST_LIST_MAX_ROWS
+GUEST_LIST_BATCH_SIZE = settings.GUEST_LIST_BATCH_SIZE
+
+QR_CACHE_MAX_BYTES = settings.QR_CACHE_MAX_BYTES
+QR_DISK_CACHE_DIR = settings.QR_DISK_CACHE_DIR
+QR_PRERENDER_WORKERS = settings.QR_PRERENDER_WORKERS
+
+SCAN_SYNC_MAX_BATCH = settings.SCAN_SYNC_MAX_BATCH
+
+LIVE_MAX_CONNECTIONS_PER_EVENT = settings.LIVE_MAX_CONNECTIONS_PER_EVENT
+LIVE_HEARTBEAT_SECONDS = settings.LIVE_HEARTBEAT_SECONDS
+LIVE_QUEUE_SIZE = settings.LIVE_QUEUE_SIZE
+
+TYPEAHEAD_MAX_EVENTS = settings.TYPEAHEAD_MAX_EVENTS
+
+JOB_WORKERS = settings.JOB_WORKERS
+JOB_QUEUE_SIZE = settings.JOB_QUEUE_SIZE
+JOB_MAX_ATTEMPTS = settings.JOB_MAX_ATTEMPTS
+JOB_RETRY_DELAY_SECONDS = settings.JOB_RETRY_DELAY_SECONDS
+JOB_HISTORY_SIZE = settings.JOB_HISTORY_SIZE
+
+AUTH_CACHE_MAX_USERS = settings.AUTH_CACHE_MAX_USERS
+AUTH_CACHE_TTL_SECONDS = settings.AUTH_CACHE_TTL_SECONDS
+
+HTTP_CACHE_POLICIES = settings.HTTP_CACHE_POLICIES
+
+PAGE_SIZE_DEFAULT = settings.PAGE_SIZE_DEFAULT
+PAGE_SIZE_MAX = settings.PAGE_SIZE_MAX
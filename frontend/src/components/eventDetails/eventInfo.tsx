@@ -100,7 +100,7 @@ const EventInfo: React.FC<EventInfoProps> = ({ setGuestList }) => {
     <div className="body mt-4">
       <div className="event-info rounded-xl overflow-clip">
         <img
-          src={`${url}/event/event-image/${id}`}
+          src={`${url}/event/event-image/${id}?size=card`}
           alt="image of an event"
           className="w-full md:w-1/5"
         />
@@ -2,7 +2,11 @@ import { useEffect, useRef, useState } from "react";
 import axios from "axios";
 
 import { GuestResponse, Guest } from "../../constants/interfaces";
-import { copyToClipboard, fetchEventDetails } from "../../utils/functions";
+import {
+  copyToClipboard,
+  fetchEventDetails,
+  waitForImport,
+} from "../../utils/functions";
 import ActionButton from "../actionbutton";
 import { icons } from "../../constants/media";
 import { url } from "../../constants/variables";
@@ -46,12 +50,17 @@ const ModalActions: React.FC = () => {
         `${url}/event/guests-bulk/${id}`,
         formData,
         {
+          withCredentials: true,
           headers: {
             "Content-Type": "multipart/form-data",
           },
         }
       );
-      if (response.status == 200 && id) {
+      if (response.status == 202 && id) {
+        const result = await waitForImport(response.data.id);
+        if (result.rows_failed > 0) {
+          console.warn(`${result.rows_failed} guest rows were not imported`);
+        }
         fetchEventDetails(id, setGuestList);
         setActiveStep("guestList");
         setSelectedFile(null);
@@ -450,7 +450,7 @@ const EventDetailsPage = () => {
                   <CardContent className="p-0">
                     <div className="relative">
                       <img
-                        src={`${url}/event/event-image/${id}`}
+                        src={`${url}/event/event-image/${id}?size=card`}
                         alt={`image of ${eventDetails.name} Event`}
                         className="w-full h-64 object-cover rounded-t-lg"
                         onError={(e) => {
@@ -203,7 +203,7 @@ const Home: React.FC = () => {
                     >
                       <div className="relative">
                         <img
-                          src={`${url}/event/event-image/${event.id}`}
+                          src={`${url}/event/event-image/${event.id}?size=thumb`}
                           alt={event.name}
                           className="w-16 h-16 rounded-lg object-cover"
                         />
@@ -1,8 +1,8 @@
 // store for saving events of authenticated user
 import { create } from "zustand";
-import axios from "axios";
 
 import { url } from "../constants/variables";
+import { fetchAllPages } from "../utils/functions";
 
 interface Event {
   id: number;
@@ -30,10 +30,8 @@ export const useEventStore = create<EventStore>((set) => ({
   fetchEvents: async () => {
     set({ isLoading: true, error: null });
     try {
-      const response = await axios.get(`${url}/event/events`, {
-        withCredentials: true,
-      });
-      set({ events: response.data, isLoading: false });
+      const events = await fetchAllPages<Event>(`${url}/event/events`, true);
+      set({ events, isLoading: false });
     } catch (error) {
       set({ error: "Failed to fetch events", isLoading: false });
     }
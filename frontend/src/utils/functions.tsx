@@ -2,6 +2,41 @@ import axios from "axios";
 import { url } from "../constants/variables";
 import { EventResponse } from "../constants/interfaces";
 
+// Follows next_cursor through every page of a paginated list endpoint
+export const fetchAllPages = async <T,>(
+  endpoint: string,
+  withCredentials = false
+): Promise<T[]> => {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const response: { data: { items: T[]; next_cursor: string | null } } =
+      await axios.get(endpoint, {
+        params: { limit: 200, ...(cursor && { cursor }) },
+        withCredentials,
+      });
+    items.push(...response.data.items);
+    cursor = response.data.next_cursor;
+  } while (cursor);
+  return items;
+};
+
+// Polls a guest list import until it has completed or failed
+export const waitForImport = async (
+  importId: string,
+  intervalMs = 1000
+): Promise<{ status: string; rows_inserted: number; rows_failed: number }> => {
+  for (;;) {
+    const response = await axios.get(`${url}/event/imports/${importId}`, {
+      withCredentials: true,
+    });
+    if (["completed", "failed"].includes(response.data.status)) {
+      return response.data;
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
+
 // converting date format to dd-MMM
 export const formatDate = (dateStr: string) => {
   const date = new Date(dateStr);
@@ -54,9 +89,11 @@ export const fetchEventDetails = async <T extends EventResponse>(
   setData?: React.Dispatch<React.SetStateAction<T>>
 ) => {
   try {
-    const [eventRes, guestsRes] = await Promise.all([
+    const [eventRes, guests] = await Promise.all([
       axios.get(`${url}/event/get-event/${id}`, { withCredentials: true }),
-      axios.get(`${url}/event/guests/${id}`),
+      fetchAllPages<{ id: string; name: string; tags: string }>(
+        `${url}/event/guests/${id}`
+      ),
     ]);
     if (eventRes.status === 200) {
       const { name, date, location, expected_guests, time, status } =
@@ -71,9 +108,7 @@ export const fetchEventDetails = async <T extends EventResponse>(
       } as T);
     }
 
-    if (guestsRes.status === 200) {
-      setGuestList(guestsRes.data);
-    }
+    setGuestList(guests);
   } catch (err: any) {
     console.error(`Error: ${err}`);
   }